@@ -0,0 +1,228 @@
+# 🧮 AGREGADOS DAS DISCIPLINAS
+
+"""
+Arrays intermediários e rankings da página de disciplinas.
+
+A preparação (`preparar_engajamento`, `resumir_disciplinas`) não depende de
+nenhum parâmetro ajustável e é feita uma vez por curso e versão dos dados. As
+funções que recebem os limites (dias mínimos, percentual máximo, mínimos de
+avaliações/matrículas, Top N) apenas recortam esses arrays, de modo que mover
+um parâmetro na barra lateral recalcula só o que depende dele.
+
+Os rankings de notas, conclusões, acessos, taxa e tempo de conclusão são lidos
+dos placares (`placares.montar_placar`), já ordenados; os de engajamento, que
+dependem dos critérios de abandono, usam a seleção parcial `placares.top_k`.
+"""
+
+import numpy as np
+import pandas as pd
+
+from esbocos import BALDES_PERCENTUAL, baldes_percentual
+from placares import top_k
+
+NS_POR_DIA = 86_400 * 10**9
+
+
+# ========================================
+# FUNÇÕES AUXILIARES
+# ========================================
+
+def _datas_ns(serie):
+    """Datas como inteiros em nanossegundos (NaT vira o menor int64)"""
+    return serie.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def _contar(codigos, n_disciplinas, pesos=None):
+    """Soma por código de disciplina (códigos -1, sem nome, são ignorados)"""
+    return np.bincount(codigos + 1, weights=pesos, minlength=n_disciplinas + 1)[1:]
+
+
+def nomes_disciplinas(df_disciplinas):
+    """Nomes das disciplinas indexados pelo `codDisciplina`"""
+    pares = df_disciplinas[['codDisciplina', 'Disciplina']].drop_duplicates('codDisciplina')
+    pares = pares[pares['codDisciplina'] >= 0].sort_values('codDisciplina')
+    return pares['Disciplina'].to_numpy()
+
+
+# ========================================
+# PREPARAÇÃO (INDEPENDENTE DOS PARÂMETROS)
+# ========================================
+
+def preparar_engajamento(df_disciplinas):
+    """
+    Disciplinas candidatas à análise de engajamento, ordenadas pela liberação.
+
+    Mantém apenas linhas liberadas, sem data de término e com menos de 100% de
+    conclusão. Com os arrays ordenados por `Liberado a Partir De`, o filtro
+    "liberada há mais de X dias" vira um prefixo (busca binária). O balde de
+    esboço de cada percentual já fica calculado para o histograma de abandono.
+    """
+    liberado = df_disciplinas['Liberado a Partir De']
+    percentual = df_disciplinas['Percentual Concluído'].to_numpy(dtype='float64')
+    candidatas = (liberado.notna().to_numpy()
+                  & df_disciplinas['Data Término'].isna().to_numpy()
+                  & (percentual < 100))
+
+    liberado_ns = _datas_ns(liberado)[candidatas]
+    ordem = np.argsort(liberado_ns, kind='stable')
+
+    percentual = percentual[candidatas][ordem]
+    return {
+        'liberado': liberado_ns[ordem],
+        'percentual': percentual,
+        'balde': baldes_percentual(percentual),
+        'acessou': df_disciplinas['Último Acesso'].notna().to_numpy()[candidatas][ordem],
+        'disciplina': df_disciplinas['codDisciplina'].to_numpy()[candidatas][ordem],
+    }
+
+
+def resumir_disciplinas(df_disciplinas, n_disciplinas):
+    """Somas e contagens por disciplina usadas pelos rankings da página"""
+    codigos = df_disciplinas['codDisciplina'].to_numpy()
+
+    nota = df_disciplinas['Nota de Aproveitamento Final'].to_numpy(dtype='float64')
+    tem_nota = ~np.isnan(nota)
+
+    percentual = df_disciplinas['Percentual Concluído'].to_numpy(dtype='float64')
+    tem_percentual = ~np.isnan(percentual)
+
+    inicio = df_disciplinas['Data Início']
+    termino = df_disciplinas['Data Término']
+    com_datas = (inicio.notna() & termino.notna()).to_numpy()
+    dias = (_datas_ns(termino)[com_datas] - _datas_ns(inicio)[com_datas]) // NS_POR_DIA
+    validos = dias >= 0  # Remover valores negativos
+    codigos_tempo = codigos[com_datas][validos]
+
+    return pd.DataFrame({
+        'soma_nota': _contar(codigos[tem_nota], n_disciplinas, nota[tem_nota]),
+        'avaliacoes': _contar(codigos[tem_nota], n_disciplinas),
+        'conclusoes': _contar(codigos[percentual == 100], n_disciplinas),
+        'acessos': _contar(codigos[df_disciplinas['Último Acesso'].notna().to_numpy()], n_disciplinas),
+        'soma_percentual': _contar(codigos[tem_percentual], n_disciplinas, percentual[tem_percentual]),
+        'com_percentual': _contar(codigos[tem_percentual], n_disciplinas),
+        # idAluno = -1: linha sem aluno na exportação
+        'matriculas': _contar(codigos[df_disciplinas['idAluno'].to_numpy() >= 0], n_disciplinas),
+        'soma_dias': _contar(codigos_tempo, n_disciplinas, dias[validos].astype('float64')),
+        'com_dias': _contar(codigos_tempo, n_disciplinas),
+    })
+
+
+# ========================================
+# RECORTES DEPENDENTES DOS PARÂMETROS
+# ========================================
+
+def classificar_engajamento(engajamento, data_limite, percentual_maximo, n_disciplinas):
+    """
+    Classifica as disciplinas liberadas antes de `data_limite` com menos de
+    `percentual_maximo`% de conclusão em não iniciadas, apenas visualizadas e
+    abandonadas. Retorna contagens por disciplina e o esboço (histograma de
+    baldes de percentual e soma) das abandonadas.
+    """
+    fim = np.searchsorted(engajamento['liberado'], pd.Timestamp(data_limite).value, side='left')
+    percentual = engajamento['percentual'][:fim]
+    acessou = engajamento['acessou'][:fim]
+    disciplina = engajamento['disciplina'][:fim]
+
+    base = percentual < percentual_maximo
+    zerada = percentual == 0
+    nao_iniciadas = zerada & ~acessou
+    visualizadas = zerada & acessou
+    abandonadas = (percentual > 0) & base
+
+    return {
+        'total': int(base.sum()),
+        'nao_iniciadas': _contar(disciplina[nao_iniciadas], n_disciplinas),
+        'visualizadas': _contar(disciplina[visualizadas], n_disciplinas),
+        'abandonadas': _contar(disciplina[abandonadas], n_disciplinas),
+        'total_nao_iniciadas': int(nao_iniciadas.sum()),
+        'total_visualizadas': int(visualizadas.sum()),
+        'total_abandonadas': int(abandonadas.sum()),
+        'histograma_abandonadas': np.bincount(engajamento['balde'][:fim][abandonadas], minlength=BALDES_PERCENTUAL),
+        'soma_abandonadas': float(percentual[abandonadas].sum()),
+    }
+
+
+def ranking_contagem(contagens, nomes, top_n, coluna='Quantidade'):
+    """Top N disciplinas por contagem (equivalente a value_counts().head(top_n)), por seleção parcial"""
+    codigos = top_k(contagens, top_n, contagens > 0)
+    return pd.DataFrame({'Disciplina': nomes[codigos], coluna: contagens[codigos].astype('int64')})
+
+
+def tabela_notas(resumo, nomes):
+    """Nota média e quantidade de avaliações por disciplina, da maior para a menor nota"""
+    com_nota = resumo['avaliacoes'].to_numpy() > 0
+    tabela = pd.DataFrame({
+        'Disciplina': nomes[com_nota],
+        'Nota Média': resumo['soma_nota'].to_numpy()[com_nota] / resumo['avaliacoes'].to_numpy()[com_nota],
+        'Quantidade de Avaliações': resumo['avaliacoes'].to_numpy()[com_nota].astype('int64'),
+    })
+    return tabela.sort_values('Nota Média', ascending=False, kind='stable').reset_index(drop=True)
+
+
+# ========================================
+# RANKINGS LIDOS DOS PLACARES
+# ========================================
+
+def _primeiras(placar, ranking, top_n):
+    """Códigos e somas/contagens das top_n primeiras disciplinas de um ranking do placar"""
+    codigos = placar['ordens'][ranking][:top_n]
+    return codigos, placar['resumo'].loc[codigos]
+
+
+def _quantis_codigos(quantis, codigos, coluna):
+    """Coluna de quantis (por `codDisciplina`) alinhada aos códigos do ranking"""
+    return quantis[coluna].reindex(codigos).to_numpy(dtype='float64')
+
+
+def ranking_placar(placar, ranking, nomes, top_n, coluna):
+    """Top N disciplinas de um ranking por contagem do placar ('conclusoes' ou 'acessos')"""
+    codigos, linhas = _primeiras(placar, ranking, top_n)
+    return pd.DataFrame({'Disciplina': nomes[codigos], coluna: linhas[ranking].to_numpy().astype('int64')})
+
+
+def ranking_notas(placar, nomes, top_n):
+    """Disciplinas com maior nota média (mínimo de avaliações do placar)"""
+    codigos, linhas = _primeiras(placar, 'notas', top_n)
+    return pd.DataFrame({
+        'Disciplina': nomes[codigos],
+        'Nota Média': linhas['soma_nota'].to_numpy() / linhas['avaliacoes'].to_numpy(),
+        'Quantidade de Avaliações': linhas['avaliacoes'].to_numpy().astype('int64'),
+    })
+
+
+def ranking_taxa_conclusao(placar, nomes, top_n, quantis=None):
+    """
+    Disciplinas com maior taxa média de conclusão (mínimo de matrículas do placar).
+
+    Com `quantis` (de `esbocos.quantis_por_disciplina`), inclui a mediana do
+    percentual concluído.
+    """
+    codigos, linhas = _primeiras(placar, 'taxa', top_n)
+    tabela = pd.DataFrame({
+        'Disciplina': nomes[codigos],
+        'Taxa Média de Conclusão': linhas['soma_percentual'].to_numpy() / linhas['com_percentual'].to_numpy(),
+        'Total de Matrículas': linhas['matriculas'].to_numpy().astype('int64'),
+    })
+    if quantis is not None:
+        tabela['Mediana de Conclusão'] = _quantis_codigos(quantis, codigos, 'q50')
+    return tabela
+
+
+def ranking_tempo_conclusao(placar, nomes, top_n, quantis=None):
+    """
+    Disciplinas concluídas mais rapidamente, em média (mínimo de conclusões do
+    placar, o mesmo das avaliações).
+
+    Com `quantis` (de `esbocos.quantis_por_disciplina`), inclui a mediana e o
+    percentil 90 dos dias até a conclusão.
+    """
+    codigos, linhas = _primeiras(placar, 'tempo', top_n)
+    tabela = pd.DataFrame({
+        'Disciplina': nomes[codigos],
+        'Média de Dias': linhas['soma_dias'].to_numpy() / linhas['com_dias'].to_numpy(),
+        'Quantidade': linhas['com_dias'].to_numpy().astype('int64'),
+    })
+    if quantis is not None:
+        tabela['Mediana de Dias'] = _quantis_codigos(quantis, codigos, 'q50')
+        tabela['P90 de Dias'] = _quantis_codigos(quantis, codigos, 'q90')
+    return tabela
@@ -0,0 +1,164 @@
+# 🔥 PRÉ-AQUECIMENTO DOS CACHES
+
+"""
+Pré-aquecimento dos caches do dashboard.
+
+O Streamlit só executa o script quando a primeira sessão se conecta, então o
+primeiro usuário após um deploy pagaria a importação do Plotly e o
+`load_data()`. O dashboard chama `iniciar_aquecimento()` antes da tela de
+login: as tarefas rodam em uma thread de fundo, uma única vez por processo,
+enquanto o usuário digita a senha.
+
+Para aquecer no momento em que o servidor sobe (sem esperar um usuário), suba
+o servidor por este arquivo em vez de `streamlit run`. Ele inicia o Streamlit
+no mesmo processo e, assim que o servidor responde, abre uma sessão headless
+que executa o script uma vez. É o comando de entrada do deploy (devcontainer,
+Dockerfile, systemd...); os demais argumentos vão para o `streamlit run`:
+
+    python aquecimento.py --servir --server.port 8501
+
+Com o servidor já no ar, `python aquecimento.py --url http://localhost:8501`
+apenas dispara a sessão de aquecimento.
+
+Falhas são registradas com `logging` (logger `aquecimento`), na saída de erro
+do servidor.
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+
+log = logging.getLogger('aquecimento')
+
+_trava = threading.Lock()
+_thread = None
+
+
+def _executar(tarefas):
+    """Executa as tarefas em sequência; uma falha não impede as demais"""
+    for tarefa in tarefas:
+        try:
+            tarefa()
+        except Exception:
+            log.exception("Falha no aquecimento (%s)", getattr(tarefa, '__name__', tarefa))
+
+
+def iniciar_aquecimento(*tarefas):
+    """Dispara as tarefas em uma thread de fundo, apenas na primeira chamada do processo"""
+    global _thread
+    with _trava:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=_executar, args=(tarefas,),
+                                   name='aquecimento-dashboard', daemon=True)
+        # Herda o contexto da sessão que disparou o aquecimento (evita avisos do Streamlit)
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(_thread)
+        _thread.start()
+    return True
+
+
+def aguardar_aquecimento(timeout=None):
+    """Bloqueia até o fim do aquecimento (útil em testes e scripts)"""
+    if _thread is not None:
+        _thread.join(timeout)
+        return not _thread.is_alive()
+    return False
+
+
+# ========================================
+# DISPARO NA SUBIDA DO SERVIDOR
+# ========================================
+
+async def _abrir_sessao(url_ws, timeout):
+    """Conecta ao servidor, pede uma execução do script e espera ela terminar"""
+    from tornado.websocket import websocket_connect
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    conexao = await websocket_connect(url_ws)
+    try:
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        await conexao.write_message(msg.SerializeToString(), binary=True)
+
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            payload = await conexao.read_message()
+            if payload is None:
+                break
+            resposta = ForwardMsg()
+            resposta.ParseFromString(payload)
+            if resposta.WhichOneof('type') == 'script_finished':
+                return True
+        return False
+    finally:
+        conexao.close()
+
+
+def aquecer_servidor(url='http://localhost:8501', tentativas=30, intervalo=2.0, timeout=60.0):
+    """Aguarda o servidor responder e abre uma sessão para disparar o aquecimento"""
+    import asyncio
+    import urllib.request
+
+    base = url.rstrip('/')
+    for _ in range(tentativas):
+        try:
+            urllib.request.urlopen(f'{base}/_stcore/health', timeout=intervalo)
+            break
+        except OSError:
+            time.sleep(intervalo)
+    else:
+        log.error("Servidor não respondeu em %s", base)
+        return False
+
+    url_ws = base.replace('http', 'ws', 1) + '/_stcore/stream'
+    try:
+        ok = asyncio.run(_abrir_sessao(url_ws, timeout))
+    except Exception:
+        log.exception("Falha ao abrir a sessão de aquecimento em %s", url_ws)
+        return False
+    if ok:
+        log.info("Aquecimento disparado em %s", base)
+    else:
+        log.warning("Sessão de aquecimento não concluiu em %s", base)
+    return ok
+
+
+def _porta(argumentos_streamlit):
+    """Porta passada ao `streamlit run` (--server.port N ou --server.port=N), ou a padrão"""
+    for i, argumento in enumerate(argumentos_streamlit):
+        if argumento.startswith('--server.port='):
+            return argumento.split('=', 1)[1]
+        if argumento == '--server.port' and i + 1 < len(argumentos_streamlit):
+            return argumentos_streamlit[i + 1]
+    return '8501'
+
+
+def servir(script='dashboard.py', argumentos_streamlit=()):
+    """Sobe o servidor Streamlit neste processo e dispara o aquecimento assim que ele responde"""
+    from streamlit.web import cli
+
+    url = f'http://localhost:{_porta(argumentos_streamlit)}'
+    threading.Thread(target=aquecer_servidor, args=(url,), name='aquecimento-servidor', daemon=True).start()
+    sys.argv = ['streamlit', 'run', script, *argumentos_streamlit]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="Sobe o dashboard já aquecido ou dispara o pré-aquecimento",
+                                     allow_abbrev=False)
+    parser.add_argument('--servir', action='store_true',
+                        help="sobe o servidor (demais argumentos vão para o streamlit run) e aquece os caches")
+    parser.add_argument('--script', default='dashboard.py')
+    parser.add_argument('--url', default='http://localhost:8501')
+    args, argumentos_streamlit = parser.parse_known_args()
+    if args.servir:
+        servir(args.script, argumentos_streamlit)
+    elif argumentos_streamlit:
+        parser.error(f"argumentos não reconhecidos: {' '.join(argumentos_streamlit)}")
+    else:
+        aquecer_servidor(args.url)
@@ -0,0 +1,217 @@
+# 🏋️ TESTE DE CARGA COM SESSÕES SIMULTÂNEAS
+
+"""
+Simula N sessões simultâneas do dashboard, sem navegador nem serviços externos.
+
+Cada sessão executa o `dashboard.py` real com o `AppTest` do Streamlit, no mesmo
+processo (como o servidor faz, uma thread por sessão): faz login pelo
+`check_password`, troca de curso na barra lateral e percorre todas as páginas
+do menu. Para cada nível de concorrência são reportados os percentis de
+latência por rerun, a vazão e a memória do processo.
+
+Rode na pasta que contém os arquivos de dados:
+
+    python carga_sessoes.py --sessoes 1 2 4 8 --rodadas 2
+"""
+
+import argparse
+import os
+import random
+import resource
+import threading
+import time
+
+import numpy as np
+
+ROTULO_CURSO = "Selecione o Curso:"
+ROTULO_MENU = "Navegação:"
+
+
+# ========================================
+# MEDIÇÕES
+# ========================================
+
+def memoria_processo_mb():
+    """Memória residente atual do processo (VmRSS no Linux; pico nos demais sistemas)"""
+    try:
+        with open('/proc/self/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return pico / (1024 * 1024) if pico > 1 << 32 else pico / 1024
+
+
+def _widget(colecao, rotulo):
+    """Localiza um widget pelo rótulo"""
+    for widget in colecao:
+        if widget.label == rotulo:
+            return widget
+    raise LookupError(f"Widget '{rotulo}' não encontrado")
+
+
+class _Coletor:
+    """Acumula latências e erros de várias sessões (thread-safe)"""
+
+    def __init__(self):
+        self.latencias = []
+        self.erros = []
+        self._trava = threading.Lock()
+
+    def registrar_erro(self, mensagem):
+        """Registra uma falha fora de um rerun"""
+        with self._trava:
+            self.erros.append(mensagem)
+
+    def rerun(self, app, acao, descricao):
+        """Executa uma interação e registra a latência do rerun"""
+        inicio = time.perf_counter()
+        try:
+            acao()
+            app.run()
+        except Exception as e:
+            self.registrar_erro(f"{descricao}: {e}")
+            return False
+        duracao = time.perf_counter() - inicio
+        with self._trava:
+            self.latencias.append(duracao)
+            if len(app.exception):
+                self.erros.append(f"{descricao}: {app.exception[0].message}")
+        return True
+
+
+# ========================================
+# SESSÕES
+# ========================================
+
+def compartilhar_runtime():
+    """
+    Faz todas as sessões simuladas compartilharem um único Runtime.
+
+    O AppTest cria e descarta o Runtime global a cada rerun, o que derruba
+    sessões executadas em paralelo. No servidor real há um Runtime por
+    processo; aqui ele é instalado uma vez e o AppTest passa a gravar o seu
+    em uma subclasse descartável.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = type('RuntimeDaSessao', (Runtime,), {})
+
+
+def simular_sessao(script, senha, rodadas, coletor, semente, timeout, barreira=None):
+    """Uma sessão: login, troca de cursos e navegação por todas as páginas"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=timeout)
+    if barreira is not None:
+        barreira.wait()
+
+    if not coletor.rerun(app, lambda: None, "abertura"):
+        return
+    if not coletor.rerun(app, lambda: app.text_input(key="password").input(senha), "login"):
+        return
+    if not any(w.label == ROTULO_CURSO for w in app.sidebar.selectbox):
+        coletor.registrar_erro("login: senha recusada")
+        return
+
+    cursos = list(_widget(app.sidebar.selectbox, ROTULO_CURSO).options)
+    paginas = list(_widget(app.sidebar.radio, ROTULO_MENU).options)
+    random.Random(semente).shuffle(cursos)
+
+    for _ in range(rodadas):
+        for curso in cursos:
+            seletor = _widget(app.sidebar.selectbox, ROTULO_CURSO)
+            coletor.rerun(app, lambda: seletor.select(curso), f"curso {curso[:30]}")
+            for pagina in paginas:
+                menu = _widget(app.sidebar.radio, ROTULO_MENU)
+                coletor.rerun(app, lambda: menu.set_value(pagina), f"página {pagina}")
+
+
+def executar_nivel(n_sessoes, script, senha, rodadas, timeout):
+    """Dispara `n_sessoes` simultâneas e retorna as estatísticas do nível"""
+    coletor = _Coletor()
+    barreira = threading.Barrier(n_sessoes)
+    threads = [
+        threading.Thread(target=simular_sessao,
+                         args=(script, senha, rodadas, coletor, semente, timeout, barreira),
+                         name=f"sessao-{semente}")
+        for semente in range(n_sessoes)
+    ]
+
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias = np.array(coletor.latencias) * 1000
+    p50, p90, p99 = np.percentile(latencias, [50, 90, 99]) if len(latencias) else (np.nan,) * 3
+    return {
+        'sessoes': n_sessoes,
+        'reruns': len(latencias),
+        'p50_ms': p50,
+        'p90_ms': p90,
+        'p99_ms': p99,
+        'max_ms': latencias.max() if len(latencias) else np.nan,
+        'reruns_por_s': len(latencias) / duracao if duracao > 0 else 0,
+        'memoria_mb': memoria_processo_mb(),
+        'erros': coletor.erros,
+    }
+
+
+def imprimir_relatorio(resultados):
+    """Tabela com uma linha por nível de concorrência"""
+    print(f"\n{'Sessões':>8} {'Reruns':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'máx ms':>8} {'reruns/s':>9} {'RSS MB':>8} {'Erros':>6}")
+    for r in resultados:
+        print(f"{r['sessoes']:>8} {r['reruns']:>7} {r['p50_ms']:>8.0f} {r['p90_ms']:>8.0f} "
+              f"{r['p99_ms']:>8.0f} {r['max_ms']:>8.0f} {r['reruns_por_s']:>9.2f} "
+              f"{r['memoria_mb']:>8.0f} {len(r['erros']):>6}")
+    for r in resultados:
+        for erro in r['erros'][:5]:
+            print(f"  ⚠️ [{r['sessoes']} sessões] {erro}")
+
+
+if __name__ == "__main__":
+    try:
+        from config import SENHA_DASHBOARD
+    except ImportError:
+        SENHA_DASHBOARD = "admin123"
+
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard com sessões simultâneas")
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="Níveis de concorrência a testar")
+    parser.add_argument('--rodadas', type=int, default=1,
+                        help="Quantas vezes cada sessão percorre todos os cursos")
+    parser.add_argument('--script', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py'))
+    parser.add_argument('--senha', default=SENHA_DASHBOARD)
+    parser.add_argument('--timeout', type=float, default=120, help="Tempo máximo por rerun (s)")
+    parser.add_argument('--sem-aquecimento', action='store_true',
+                        help="Não executar uma sessão inicial para aquecer os caches")
+    args = parser.parse_args()
+
+    compartilhar_runtime()
+    print(f"Memória inicial: {memoria_processo_mb():.0f} MB")
+    if not args.sem_aquecimento:
+        inicio = time.perf_counter()
+        aquecimento = executar_nivel(1, args.script, args.senha, 1, args.timeout)
+        print(f"Sessão de aquecimento: {time.perf_counter() - inicio:.1f}s "
+              f"({aquecimento['reruns']} reruns, {len(aquecimento['erros'])} erros)")
+
+    resultados = [executar_nivel(n, args.script, args.senha, args.rodadas, args.timeout)
+                  for n in args.sessoes]
+    imprimir_relatorio(resultados)
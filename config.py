@@ -3,6 +3,10 @@
 """
 Este arquivo permite personalizar os critérios e parâmetros usados nas análises do dashboard.
 Modifique os valores abaixo conforme necessário e reinicie o dashboard.
+
+Os critérios de abandono, os mínimos dos rankings e os Top N também podem ser
+ajustados ao vivo em "⚙️ Parâmetros de Análise", na barra lateral; os valores
+daqui são o ponto de partida de cada sessão.
 """
 
 # ========================================
@@ -74,6 +78,33 @@ CORES = {
     'alerta': '#e74c3c'        # Vermelho para métricas de atenção
 }
 
+# ========================================
+# ARMAZENAMENTO PARTICIONADO
+# ========================================
+
+# Ler os dados das partições por curso geradas com: python particoes.py
+# A Visão Geral usa apenas o manifesto e cada curso lê só a própria partição
+# (gere as partições novamente sempre que os arquivos de origem mudarem)
+USAR_PARTICOES = False
+
+# Pasta das partições e do manifesto
+PASTA_PARTICOES = 'dados_particionados'
+
+# ========================================
+# ORÇAMENTO DE MEMÓRIA
+# ========================================
+
+# Reduzir a memória das tabelas carregadas: números no menor tipo sem perda,
+# datas em texto convertidas para data e textos pouco usados (nome, endereço,
+# contatos, documentos) em strings do pyarrow
+ECONOMIZAR_MEMORIA = False
+
+# Limite (em MB) para as tabelas carregadas, com ECONOMIZAR_MEMORIA: se a redução
+# não bastar, os textos usados em filtros (curso, disciplina, status...) também
+# viram strings do pyarrow até caber. O resultado aparece no relatório de memória
+# da página "Dados Detalhados" (None = sem limite)
+ORCAMENTO_MEMORIA_MB = None
+
 # ========================================
 # CACHE E PERFORMANCE
 # ========================================
@@ -81,6 +112,11 @@ CORES = {
 # Tempo de cache dos dados em segundos (None = cache permanente até reiniciar)
 TEMPO_CACHE_SEGUNDOS = None
 
+# Limite (em MB) para as tabelas filtradas e insumos de página guardados por
+# sessão, somando todas as sessões; acima dele, as entradas usadas há mais
+# tempo são descartadas e recalculadas quando voltarem a ser usadas
+LIMITE_MEMO_SESSOES_MB = 1024
+
 # ========================================
 # NOTAS E DOCUMENTAÇÃO
 # ========================================
@@ -104,6 +140,10 @@ EXEMPLOS DE USO:
 5. Para alterar a senha:
    SENHA_DASHBOARD = "minha_nova_senha"
    (Depois execute: python gerar_senha.py)
+
+6. Para reduzir a memória em servidores compartilhados:
+   ECONOMIZAR_MEMORIA = True
+   ORCAMENTO_MEMORIA_MB = 2048
 """
 
 # ========================================
@@ -114,9 +154,16 @@ def validar_configuracoes():
     """Valida se as configurações estão corretas"""
     assert DIAS_MINIMOS_ABANDONO > 0, "DIAS_MINIMOS_ABANDONO deve ser maior que 0"
     assert 0 < PERCENTUAL_MAXIMO_ABANDONO <= 100, "PERCENTUAL_MAXIMO_ABANDONO deve estar entre 1 e 100"
+    assert 0 < ABANDONO_INICIAL_PERCENTUAL <= 100, "ABANDONO_INICIAL_PERCENTUAL deve estar entre 1 e 100"
     assert PERCENTUAL_MINIMO_CONCLUSAO >= 0, "PERCENTUAL_MINIMO_CONCLUSAO deve ser >= 0"
+    assert MIN_AVALIACOES_NOTA > 0, "MIN_AVALIACOES_NOTA deve ser maior que 0"
+    assert MIN_MATRICULAS_TAXA > 0, "MIN_MATRICULAS_TAXA deve ser maior que 0"
     assert TOP_N_CURSOS > 0, "TOP_N_CURSOS deve ser maior que 0"
-    assert TOP_N_DISCIPLINAS > 0, "TOP_N_DISCIPLINAS deve ser maior que 0"
+    # Os placares do dashboard guardam no máximo 100 disciplinas (placares.CAPACIDADE_PLACAR)
+    assert 0 < TOP_N_DISCIPLINAS <= 100, "TOP_N_DISCIPLINAS deve estar entre 1 e 100"
+    assert 0 < TOP_N_DISCIPLINAS_ACESSO <= 100, "TOP_N_DISCIPLINAS_ACESSO deve estar entre 1 e 100"
+    assert LIMITE_MEMO_SESSOES_MB > 0, "LIMITE_MEMO_SESSOES_MB deve ser maior que 0"
+    assert ORCAMENTO_MEMORIA_MB is None or ORCAMENTO_MEMORIA_MB > 0, "ORCAMENTO_MEMORIA_MB deve ser maior que 0 (ou None)"
     assert isinstance(APENAS_SEM_TERMINO, bool), "APENAS_SEM_TERMINO deve ser True ou False"
     print("✅ Configurações validadas com sucesso!")
     return True
@@ -0,0 +1,271 @@
+# 🧭 RETENÇÃO POR COORTE
+
+"""
+Matriz de retenção por coorte de matrícula.
+
+A coorte de uma matrícula é o mês da `Data Matrícula`. A matrícula conta como
+retida no deslocamento k (meses desde a matrícula) se teve alguma atividade
+(`Último Acesso` do curso ou de qualquer disciplina vinculada) k meses ou mais
+depois da coorte. `Aluno Ativo` separa a matriz entre ativos e inativos.
+
+Tudo é calculado sobre meses inteiros: cada matrícula cai em uma célula
+(curso, status, coorte, último deslocamento ativo) de um histograma montado
+com `np.bincount`, e a retenção é a soma acumulada reversa desse histograma.
+O histograma cobre no máximo `JANELA_COORTES_MESES` coortes até o snapshot;
+matrículas mais antigas (ou com datas implausíveis, como 1900-01-01) ficam
+somadas na primeira linha em vez de esticar a matriz, que cresce com o
+quadrado do número de meses.
+Quando chega um novo snapshot, `atualizar_coortes` move apenas as matrículas
+que mudaram de célula (e inclui as novas) em vez de recontar tudo.
+"""
+
+import numpy as np
+import pandas as pd
+
+SEM_ATIVIDADE = -1
+JANELA_COORTES_MESES = 120
+
+
+# ========================================
+# FUNÇÕES AUXILIARES
+# ========================================
+
+def _mes(serie):
+    """Datas como índice de mês inteiro (ano * 12 + mês - 1); ausentes viram -1"""
+    datas = serie.to_numpy(dtype='datetime64[M]')
+    meses = datas.astype('int64') + 1970 * 12
+    return np.where(np.isnat(datas), -1, meses).astype('int32')
+
+
+def _chaves(id_aluno, id_curso):
+    """
+    Chave estável de matrícula entre snapshots, (idCurso, idAluno) em um int64.
+
+    Segue a mesma ordem de `df_cursos` na carga, então a ordenação é quase linear.
+    Rematrículas no mesmo curso repetem a chave (ver `_ordenar_matriculas`).
+    """
+    return (np.asarray(id_curso, dtype='int64') << 40) | np.asarray(id_aluno, dtype='int64')
+
+
+def _ordenar_matriculas(atividade):
+    """
+    Matrículas ordenadas por (chave, coorte), com o ordinal de cada uma dentro
+    da própria chave: a k-ésima rematrícula de um snapshot corresponde à
+    k-ésima do anterior.
+    """
+    ordem = np.lexsort((atividade['coorte'], atividade['chave']))
+    matriculas = {campo: atividade[campo][ordem] for campo in ('chave', 'curso', 'ativo', 'coorte', 'ultimo')}
+    chave = matriculas['chave']
+    matriculas['ordinal'] = np.arange(len(chave)) - np.searchsorted(chave, chave, side='left')
+    return matriculas
+
+
+def rotulo_mes(mes):
+    """Índice de mês inteiro para 'AAAA-MM'"""
+    return f"{mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+# ========================================
+# ATIVIDADE POR MATRÍCULA
+# ========================================
+
+def extrair_atividade(df_cursos, df_disciplinas):
+    """
+    Coorte, último mês de atividade e status de cada matrícula do snapshot.
+
+    `df_disciplinas` é a tabela fato (com `idMatricula`); o último acesso das
+    disciplinas de cada matrícula é reduzido com `np.maximum.at`.
+    """
+    ultimo = _mes(df_cursos['Último Acesso'])
+
+    id_matricula = df_disciplinas['idMatricula'].to_numpy()
+    acessos = _mes(df_disciplinas['Último Acesso'])
+    vinculadas = id_matricula >= 0
+    np.maximum.at(ultimo, id_matricula[vinculadas], acessos[vinculadas])
+
+    coorte = _mes(df_cursos['Data Matrícula'])
+    com_coorte = coorte >= 0
+
+    meses_observados = np.concatenate([ultimo, coorte])
+    return {
+        'chave': _chaves(df_cursos['idAluno'], df_cursos['idCurso'])[com_coorte],
+        'curso': df_cursos['idCurso'].to_numpy(dtype='int64')[com_coorte],
+        'ativo': (df_cursos['Aluno Ativo'] == 'Sim').to_numpy()[com_coorte].astype('int8'),
+        'coorte': coorte[com_coorte],
+        'ultimo': ultimo[com_coorte],
+        'mes_snapshot': int(meses_observados.max()) if len(meses_observados) else -1,
+    }
+
+
+# ========================================
+# HISTOGRAMA (CONSTRUÇÃO E ATUALIZAÇÃO)
+# ========================================
+
+def _deslocamento(coorte, ultimo):
+    """Último deslocamento ativo (0 = mês da matrícula; SEM_ATIVIDADE se nunca acessou)"""
+    return np.where(ultimo >= 0, np.maximum(ultimo - coorte, 0), SEM_ATIVIDADE)
+
+
+def _indices(estado, curso, ativo, coorte, ultimo):
+    """Índice plano de cada matrícula no histograma do estado"""
+    slot = np.searchsorted(estado['cursos'], curso)
+    _, n_status, n_coortes, largura = estado['histograma'].shape
+    # Coortes anteriores à janela caem na primeira linha, com o deslocamento limitado à última coluna
+    linha = np.maximum(coorte - estado['mes_base'], 0)
+    coluna = np.minimum(_deslocamento(coorte, ultimo) + 1, largura - 1)
+    return ((slot * n_status + ativo) * n_coortes + linha) * largura + coluna
+
+
+def _contar(estado, indices, sinal):
+    """Soma (ou subtrai) matrículas nas células indicadas"""
+    if len(indices):
+        estado['histograma'] += sinal * np.bincount(
+            indices, minlength=estado['histograma'].size
+        ).reshape(estado['histograma'].shape).astype(estado['histograma'].dtype)
+
+
+def _redimensionar(estado, cursos, mes_base, mes_snapshot):
+    """
+    Expande o histograma para novos cursos/meses, copiando as contagens existentes.
+
+    Se a janela avança com o snapshot, as coortes que saem dela são somadas na
+    primeira linha, como aconteceria montando o histograma do zero.
+    """
+    cursos = np.union1d(estado['cursos'], cursos) if estado else np.asarray(cursos)
+    mes_base = min(estado['mes_base'], mes_base) if estado else mes_base
+    mes_snapshot = max(estado['mes_snapshot'], mes_snapshot) if estado else mes_snapshot
+    mes_base = max(mes_base, mes_snapshot - JANELA_COORTES_MESES + 1)
+    n_coortes = max(mes_snapshot - mes_base + 1, 1)
+
+    histograma = np.zeros((len(cursos), 2, n_coortes, n_coortes + 1), dtype='int32')
+    if estado:
+        antigo = estado['histograma']
+        inicio = estado['mes_base'] - mes_base
+        if inicio < 0:
+            antigo = np.concatenate([antigo[:, :, :1 - inicio].sum(axis=2, keepdims=True),
+                                     antigo[:, :, 1 - inicio:]], axis=2)
+            inicio = 0
+        slots = np.searchsorted(cursos, estado['cursos'])
+        histograma[slots, :, inicio:inicio + antigo.shape[2], :antigo.shape[3]] = antigo
+
+    novo = dict(estado) if estado else {}
+    novo.update(cursos=cursos, mes_base=mes_base, mes_snapshot=mes_snapshot, histograma=histograma)
+    return novo
+
+
+def construir_coortes(atividade):
+    """Monta o histograma de coortes do zero"""
+    meses = atividade['coorte']
+    estado = _redimensionar(None, np.unique(atividade['curso']),
+                            int(meses.min()) if len(meses) else 0,
+                            atividade['mes_snapshot'])
+    _contar(estado, _indices(estado, atividade['curso'], atividade['ativo'],
+                             atividade['coorte'], atividade['ultimo']), 1)
+
+    estado['matriculas'] = _ordenar_matriculas(atividade)
+    return estado
+
+
+def atualizar_coortes(estado, atividade):
+    """
+    Aplica um novo snapshot sobre um estado existente.
+
+    Apenas matrículas novas, removidas ou que mudaram de célula (novo acesso,
+    mudança de status) são movidas no histograma; células de meses novos são
+    acrescentadas sem recontar as antigas.
+    """
+    if not estado:
+        return construir_coortes(atividade)
+
+    meses = atividade['coorte']
+    novo = _redimensionar(estado, np.unique(atividade['curso']),
+                          int(meses.min()) if len(meses) else estado['mes_base'],
+                          atividade['mes_snapshot'])
+
+    anteriores = estado['matriculas']
+    atuais = _ordenar_matriculas(atividade)
+
+    # Posição de cada matrícula atual no snapshot anterior: início da chave +
+    # ordinal, de modo que cada matrícula anterior corresponde a no máximo uma atual
+    if np.array_equal(anteriores['chave'], atuais['chave']):
+        pos = np.arange(len(atuais['chave']))
+        existia = np.ones(len(atuais['chave']), dtype=bool)
+    elif len(anteriores['chave']):
+        pos = np.searchsorted(anteriores['chave'], atuais['chave'], side='left') + atuais['ordinal']
+        dentro = pos < len(anteriores['chave'])
+        pos = np.where(dentro, pos, 0)
+        existia = dentro & (anteriores['chave'][pos] == atuais['chave'])
+    else:
+        pos = np.zeros(len(atuais['chave']), dtype='int64')
+        existia = np.zeros(len(atuais['chave']), dtype=bool)
+
+    mudou = np.ones(len(atuais['chave']), dtype=bool)
+    if existia.any():
+        p = pos[existia]
+        mudou[existia] = ((anteriores['ativo'][p] != atuais['ativo'][existia])
+                          | (anteriores['coorte'][p] != atuais['coorte'][existia])
+                          | (anteriores['ultimo'][p] != atuais['ultimo'][existia]))
+
+    # Sai do histograma: versão anterior das que mudaram + matrículas que sumiram
+    mantidas = np.zeros(len(anteriores['chave']), dtype=bool)
+    mantidas[pos[existia & ~mudou]] = True
+    sair = ~mantidas
+    _contar(novo, _indices(novo, anteriores['curso'][sair], anteriores['ativo'][sair],
+                           anteriores['coorte'][sair], anteriores['ultimo'][sair]), -1)
+
+    # Entra: matrículas novas e a versão atual das que mudaram
+    _contar(novo, _indices(novo, atuais['curso'][mudou], atuais['ativo'][mudou],
+                           atuais['coorte'][mudou], atuais['ultimo'][mudou]), 1)
+
+    novo['matriculas'] = atuais
+    # Matrículas movidas no histograma (novas + alteradas + removidas)
+    novo['alteradas'] = int(mudou.sum() + len(anteriores['chave']) - existia.sum())
+    return novo
+
+
+# ========================================
+# MATRIZ DE RETENÇÃO
+# ========================================
+
+def matriz_retencao(estado, id_curso=None, ativo=None, percentual=True):
+    """
+    Matriz coorte x deslocamento (meses) com a retenção de cada coorte.
+
+    `id_curso=None` soma todos os cursos; `ativo` (True/False/None) filtra pelo
+    status do aluno. Células ainda não observáveis no snapshot ficam vazias.
+    Com a janela cheia, a primeira linha ('até AAAA-MM') inclui as coortes
+    anteriores a ela.
+    """
+    histograma = estado['histograma']
+    if id_curso is not None:
+        slot = np.searchsorted(estado['cursos'], id_curso)
+        if slot >= len(estado['cursos']) or estado['cursos'][slot] != id_curso:
+            return pd.DataFrame()
+        histograma = histograma[slot:slot + 1]
+    histograma = histograma.sum(axis=0)
+    histograma = histograma[int(ativo)] if ativo is not None else histograma.sum(axis=0)
+
+    tamanho = histograma.sum(axis=1)
+    # Retidos em k = matrículas cujo último deslocamento ativo é >= k
+    retidos = np.cumsum(histograma[:, :0:-1], axis=1)[:, ::-1].astype('float64')
+
+    n_coortes, largura = retidos.shape
+    observavel = (np.arange(largura)[None, :]
+                  <= (estado['mes_snapshot'] - estado['mes_base'] - np.arange(n_coortes))[:, None])
+    retidos[~observavel] = np.nan
+    if percentual:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            retidos = retidos / tamanho[:, None] * 100
+
+    com_matriculas = tamanho > 0
+    ultima_coluna = int(observavel[com_matriculas].sum(axis=1).max()) if com_matriculas.any() else 0
+    rotulos = [rotulo_mes(estado['mes_base'] + i) for i in range(n_coortes)]
+    if estado['mes_snapshot'] - estado['mes_base'] + 1 >= JANELA_COORTES_MESES:
+        rotulos[0] = f"até {rotulos[0]}"
+    matriz = pd.DataFrame(
+        retidos[com_matriculas, :ultima_coluna],
+        index=[rotulos[i] for i in np.flatnonzero(com_matriculas)],
+        columns=list(range(ultima_coluna)),
+    )
+    matriz.insert(0, 'Matrículas', tamanho[com_matriculas])
+    return matriz
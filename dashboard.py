@@ -1,9 +1,51 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import hashlib
+import threading
+import time
+
+from agregados import (
+    classificar_engajamento,
+    nomes_disciplinas,
+    preparar_engajamento,
+    ranking_contagem,
+    ranking_notas,
+    ranking_placar,
+    ranking_taxa_conclusao,
+    ranking_tempo_conclusao,
+    resumir_disciplinas,
+    tabela_notas,
+)
+from aquecimento import iniciar_aquecimento
+from coortes import atualizar_coortes, construir_coortes, extrair_atividade, matriz_retencao
+from esbocos import (
+    construir_esbocos,
+    faixas_dias,
+    histograma_esboco,
+    intervalo_percentual,
+    quantis_histograma,
+    quantis_por_disciplina,
+    recortar_esboco,
+)
+from exportacao import FORMATOS, TarefaExportacao
+from geografia import NIVEIS, agregar_celulas, enquadramento, preparar_geografia
+from ingestao import carregar_dados, fatiar_curso, versao_snapshot
+from memo_sessao import MemoSessao, RegistroMemos
+from memoria import reduzir_tabelas, relatorio_sem_reducao
+from particoes import (
+    caminho_manifesto,
+    ler_esbocos,
+    ler_manifesto,
+    ler_particao,
+    compartilhadas_do_manifesto,
+    ler_todas_particoes,
+    nomes_do_manifesto,
+    pasta_snapshot,
+    resumir_visao_geral,
+)
+from placares import CAPACIDADE_PLACAR, disciplinas_compartilhadas, mesclar_placares, montar_placar
+from risco import ranking_risco
 
 # Configuração da página
 st.set_page_config(
@@ -26,7 +68,12 @@ try:
         ABANDONO_INICIAL_PERCENTUAL,
         BINS_HISTOGRAMA_ABANDONO,
         SENHA_DASHBOARD,
-        CORES
+        CORES,
+        USAR_PARTICOES,
+        PASTA_PARTICOES,
+        ECONOMIZAR_MEMORIA,
+        ORCAMENTO_MEMORIA_MB,
+        LIMITE_MEMO_SESSOES_MB
     )
 except ImportError:
     # Valores padrão caso o arquivo de configuração não exista
@@ -49,6 +96,206 @@ except ImportError:
         'destaque': '#2ecc71',
         'alerta': '#e74c3c'
     }
+    USAR_PARTICOES = False
+    PASTA_PARTICOES = 'dados_particionados'
+    ECONOMIZAR_MEMORIA = False
+    ORCAMENTO_MEMORIA_MB = None
+    LIMITE_MEMO_SESSOES_MB = 1024
+
+# Carregar dados
+def aplicar_orcamento_memoria(df_cursos, df_disciplinas):
+    """
+    Reduz os tipos das tabelas (se ECONOMIZAR_MEMORIA), dentro do ORCAMENTO_MEMORIA_MB,
+    e devolve o relatório antes/depois junto (None sem redução)
+    """
+    if not ECONOMIZAR_MEMORIA:
+        return df_cursos, df_disciplinas, None
+    orcamento = ORCAMENTO_MEMORIA_MB * 2**20 if ORCAMENTO_MEMORIA_MB else None
+    tabelas, relatorio = reduzir_tabelas({'Cursos': df_cursos, 'Disciplinas': df_disciplinas}, orcamento)
+    return tabelas['Cursos'], tabelas['Disciplinas'], relatorio
+
+@st.cache_data(max_entries=16)
+def memoria_atual(versao, id_curso, _df_cursos, _df_disciplinas):
+    """Bytes por coluna das tabelas como estão (sem redução)"""
+    return pd.concat([relatorio_sem_reducao(_df_cursos, 'Cursos'),
+                      relatorio_sem_reducao(_df_disciplinas, 'Disciplinas')], ignore_index=True)
+
+# Segundos entre as atualizações da barra de progresso da exportação
+INTERVALO_PROGRESSO_EXPORTACAO = 1
+
+# Versões do snapshot mantidas nos caches das tabelas completas: a atual e a
+# anterior (sessões que ainda estavam no meio de uma execução na troca)
+VERSOES_EM_CACHE = 2
+
+# As tabelas ficam em st.cache_resource: um único objeto por processo, compartilhado
+# (somente leitura) por todas as sessões, sem cópia desserializada a cada execução
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def load_data(versao):
+    """Carrega os dados dos arquivos CSV e Excel já normalizados (uma vez por versão dos arquivos)"""
+    try:
+        if USAR_PARTICOES:
+            # Snapshot completo remontado a partir das partições por curso
+            # (os avisos da ingestão ficam no manifesto)
+            df_cursos, df_disciplinas = ler_todas_particoes(PASTA_PARTICOES)
+            avisos = []
+        else:
+            # Leitura e limpeza (IDs inteiros, códigos sem espaços, colunas redundantes removidas)
+            # df_disciplinas já vem vinculada a (idAluno, idCurso) e ordenada por curso
+            avisos = []
+            df_cursos, df_disciplinas = carregar_dados(avisos=avisos)
+        
+        return (*aplicar_orcamento_memoria(df_cursos, df_disciplinas), avisos)
+    except Exception as e:
+        st.error(f"Erro ao carregar dados: {str(e)}")
+        return None, None, None, []
+
+@st.cache_data(max_entries=VERSOES_EM_CACHE)
+def carregar_manifesto(versao_manifesto):
+    """Manifesto das partições por curso (uma vez por versão do manifesto; erros não ficam em cache)"""
+    return ler_manifesto(PASTA_PARTICOES)
+
+@st.cache_resource(max_entries=16)
+def carregar_curso(versao, id_curso, pasta):
+    """Matrículas e disciplinas de um único curso, lidas apenas da partição dele"""
+    df_cursos, df_disciplinas = ler_particao(id_curso, pasta)
+    return aplicar_orcamento_memoria(df_cursos, df_disciplinas)
+
+@st.cache_data(max_entries=64)
+def visao_geral(versao, id_curso, _df_cursos):
+    """Agregados da Visão Geral calculados a partir das matrículas carregadas"""
+    return resumir_visao_geral(_df_cursos)
+
+@st.cache_resource(max_entries=4)
+def catalogo_disciplinas(versao, _df_disciplinas):
+    """Nomes das disciplinas indexados pelo código inteiro"""
+    return nomes_disciplinas(_df_disciplinas)
+
+@st.cache_resource(max_entries=64)
+def intermediarios_disciplinas(versao, id_curso, _df_disciplinas, n_disciplinas):
+    """Arrays intermediários da página de disciplinas, independentes dos parâmetros de análise"""
+    return {
+        'engajamento': preparar_engajamento(_df_disciplinas),
+        'resumo': resumir_disciplinas(_df_disciplinas, n_disciplinas),
+    }
+
+@st.cache_resource(max_entries=4)
+def compartilhadas_snapshot(versao, n_disciplinas, _df_disciplinas):
+    """Disciplinas com linhas em mais de um curso (candidatas obrigatórias na mescla dos placares)"""
+    return disciplinas_compartilhadas(_df_disciplinas, n_disciplinas)
+
+@st.cache_resource(max_entries=256)
+def placar_curso(versao, id_curso, min_avaliacoes, min_matriculas, _resumo, _compartilhadas):
+    """Rankings do curso já ordenados (até CAPACIDADE_PLACAR disciplinas cada) para os mínimos atuais"""
+    return montar_placar(_resumo, min_avaliacoes, min_matriculas, _compartilhadas)
+
+@st.cache_resource(max_entries=4)
+def resumos_cursos(versao, _df_disciplinas, n_disciplinas):
+    """Resumo por disciplina de cada curso (e das linhas sem curso), só com as disciplinas presentes nele"""
+    resumos = {}
+    for id_curso in pd.unique(_df_disciplinas['idCurso']):
+        id_curso = int(id_curso)
+        resumo = resumir_disciplinas(fatiar_curso(_df_disciplinas, id_curso), n_disciplinas)
+        resumos[id_curso] = resumo[resumo.to_numpy().any(axis=1)]
+    return resumos
+
+@st.cache_resource(max_entries=8)
+def placar_todos(versao, min_avaliacoes, min_matriculas, _df_disciplinas, n_disciplinas, _compartilhadas):
+    """Rankings de "Todos", mesclando as candidatas dos placares de cada curso (e das linhas sem curso)"""
+    placares = [montar_placar(resumo, min_avaliacoes, min_matriculas, _compartilhadas)
+                for resumo in resumos_cursos(versao, _df_disciplinas, n_disciplinas).values()]
+    return mesclar_placares(placares, min_avaliacoes, min_matriculas)
+
+@st.cache_resource(max_entries=4)
+def esbocos_snapshot(versao, pasta, _df_disciplinas):
+    """Esboços de quantis por (curso, disciplina): lidos das partições ou calculados uma vez por versão"""
+    if pasta is not None:
+        return ler_esbocos(pasta)
+    return construir_esbocos(_df_disciplinas)
+
+@st.cache_data(max_entries=64)
+def quantis_disciplinas(versao, id_curso, metrica, _esbocos):
+    """Mediana e percentil 90 de cada disciplina, combinando os esboços dos cursos selecionados"""
+    return quantis_por_disciplina(recortar_esboco(_esbocos[metrica], id_curso), metrica, (0.5, 0.9))
+
+@st.cache_resource
+def historico_coortes():
+    """Último estado das coortes no processo (estendido a cada novo snapshot)"""
+    return {'versao': None, 'estado': None, 'trava': threading.Lock()}
+
+def coortes_do_snapshot(versao, df_cursos, df_disciplinas):
+    """Histograma de coortes da versão atual, atualizado incrementalmente a partir da anterior"""
+    historico = historico_coortes()
+    with historico['trava']:
+        if historico['versao'] != versao:
+            atividade = extrair_atividade(df_cursos, df_disciplinas)
+            historico['estado'] = atualizar_coortes(historico['estado'], atividade)
+            historico['versao'] = versao
+        return historico['estado']
+
+@st.cache_resource(max_entries=16)
+def coortes_curso(versao, id_curso, mes_snapshot, _df_cursos, _df_disciplinas):
+    """Histograma de coortes de um curso lido da partição (modo particionado)"""
+    atividade = extrair_atividade(_df_cursos, _df_disciplinas)
+    # Mesmo horizonte do snapshot completo, não só o do curso
+    atividade['mes_snapshot'] = max(atividade['mes_snapshot'], mes_snapshot)
+    return construir_coortes(atividade)
+
+@st.cache_data(max_entries=16, show_spinner="Calculando risco de evasão...")
+def risco_evasao(versao, id_curso, dias_minimos, percentual_maximo, data_referencia, _df_disciplinas, _df_cursos):
+    """Ranking de risco de evasão por aluno (por versão dos dados, curso e parâmetros de abandono)"""
+    return ranking_risco(_df_disciplinas, _df_cursos, data_referencia, dias_minimos, percentual_maximo)
+
+@st.cache_resource(max_entries=64)
+def geografia_curso(versao, id_curso, _df_cursos):
+    """Posições das matrículas do curso (coordenada, centro do município ou capital da UF)"""
+    return preparar_geografia(_df_cursos)
+
+@st.cache_data(max_entries=256)
+def celulas_mapa(versao, id_curso, nivel, ativo, uf, _geografia):
+    """Matrículas agregadas por célula do mapa (o navegador recebe só as células) e as que ficaram sem município"""
+    return agregar_celulas(_geografia, nivel, ativo, uf)
+
+@st.cache_resource
+def registro_memos():
+    """Registro único do processo com o tamanho dos memos de todas as sessões"""
+    return RegistroMemos(LIMITE_MEMO_SESSOES_MB * 2**20)
+
+def memo_da_sessao():
+    """Tabelas filtradas e insumos de página da sessão atual, por (versão, curso)"""
+    if 'memo_visoes' not in st.session_state:
+        st.session_state['memo_visoes'] = MemoSessao(registro_memos())
+    return st.session_state['memo_visoes']
+
+def importar_graficos():
+    """Importa o plotly.express apenas quando uma página com gráficos é exibida"""
+    import plotly.express as px
+    return px
+
+def aquecer_caches():
+    """Carrega os dados e prepara os agregados de todos os cursos"""
+    if USAR_PARTICOES:
+        # Apenas o manifesto: cada curso é lido sob demanda
+        carregar_manifesto(versao_snapshot((caminho_manifesto(PASTA_PARTICOES),)))
+        return
+    
+    versao = versao_snapshot()
+    df_cursos, df_disciplinas, _, _ = load_data(versao)
+    if df_cursos is None or df_disciplinas is None:
+        return
+    coortes_do_snapshot(versao, df_cursos, df_disciplinas)
+    geografia_curso(versao, None, df_cursos)
+    risco_evasao(versao, None, DIAS_MINIMOS_ABANDONO, PERCENTUAL_MAXIMO_ABANDONO,
+                 date.today(), df_disciplinas, df_cursos)
+    nomes = catalogo_disciplinas(versao, df_disciplinas)
+    esbocos_snapshot(versao, None, df_disciplinas)
+    intermediarios_disciplinas(versao, None, df_disciplinas, len(nomes))
+    # Placares de cada curso (e a mescla de "Todos") com os mínimos configurados
+    placar_todos(versao, MIN_AVALIACOES_NOTA, MIN_MATRICULAS_TAXA, df_disciplinas, len(nomes),
+                 compartilhadas_snapshot(versao, len(nomes), df_disciplinas))
+
+# Pré-aquecimento: carrega dados, agregados e bibliotecas em segundo plano
+# (uma vez por processo) enquanto a tela de login é exibida
+iniciar_aquecimento(aquecer_caches, importar_graficos)
 
 # Sistema de autenticação
 def check_password():
@@ -89,62 +336,37 @@ if not check_password():
     st.warning("Aguardando autenticação…")
     st.stop()
 
-# Carregar dados
-@st.cache_data
-def load_data():
-    """Carrega os dados dos arquivos CSV e Excel"""
+# Memo da sessão: trocar de página com o mesmo curso reaproveita as tabelas e os agregados
+memo = memo_da_sessao()
+
+# Versão dos dados e cursos disponíveis
+if USAR_PARTICOES:
+    # Apenas o manifesto; as partições são lidas conforme o curso e a página
     try:
-        # Carregar dados de cursos
-        df_cursos = pd.read_csv('Cursos.csv', 
-                                encoding='ISO-8859-1', 
-                                sep=';',
-                                low_memory=False)
-        
-        # Carregar dados de disciplinas
-        df_disciplinas = pd.read_excel('Disciplinas.xlsx')
-        
-        # Converter status de aluno ativo (1 = Sim, 0 = Não) em ambos os dataframes
-        df_cursos['Aluno Ativo'] = df_cursos['Aluno Ativo'].apply(lambda x: 'Sim' if x == 1 else 'Não')
-        df_disciplinas['Aluno Ativo'] = df_disciplinas['Aluno Ativo'].apply(lambda x: 'Sim' if x == 1 else 'Não')
-        
-        # Usar Curso1 (nome completo) em vez de Curso (código)
-        df_cursos['Curso'] = df_cursos['Curso1']
-        
-        # Converter datas
-        df_cursos['Data Matrícula'] = pd.to_datetime(df_cursos['Data Matrícula'], 
-                                                      format='%d/%m/%Y %H:%M:%S', 
-                                                      errors='coerce')
-        df_cursos['Primeiro Acesso'] = pd.to_datetime(df_cursos['Primeiro Acesso'], 
-                                                       format='%d/%m/%Y %H:%M:%S', 
-                                                       errors='coerce')
-        df_cursos['Último Acesso'] = pd.to_datetime(df_cursos['Último Acesso'], 
-                                                     format='%d/%m/%Y %H:%M:%S', 
-                                                     errors='coerce')
-        
-        df_disciplinas['Data Matrícula'] = pd.to_datetime(df_disciplinas['Data Matrícula'], 
-                                                           format='%d/%m/%Y %H:%M:%S', 
-                                                           errors='coerce')
-        df_disciplinas['Data Início'] = pd.to_datetime(df_disciplinas['Data Início'], 
-                                                        errors='coerce')
-        df_disciplinas['Data Término'] = pd.to_datetime(df_disciplinas['Data Término'], 
-                                                         errors='coerce')
-        df_disciplinas['Primeiro Acesso'] = pd.to_datetime(df_disciplinas['Primeiro Acesso'], 
-                                                            format='%d/%m/%Y %H:%M:%S', 
-                                                            errors='coerce')
-        df_disciplinas['Último Acesso'] = pd.to_datetime(df_disciplinas['Último Acesso'], 
-                                                          format='%d/%m/%Y %H:%M:%S', 
-                                                          errors='coerce')
-        
-        return df_cursos, df_disciplinas
+        manifesto = carregar_manifesto(versao_snapshot((caminho_manifesto(PASTA_PARTICOES),)))
     except Exception as e:
-        st.error(f"Erro ao carregar dados: {str(e)}")
-        return None, None
-
-# Carregar dados
-df_cursos, df_disciplinas = load_data()
+        st.error(f"Erro ao ler as partições em '{PASTA_PARTICOES}': {str(e)}. "
+                 "Gere-as com: python particoes.py")
+        st.stop()
+    versao_dados = manifesto['versao']
+    pasta_dados = pasta_snapshot(manifesto, PASTA_PARTICOES)
+    avisos_carga = manifesto.get('avisos', [])
+    memo.manter_versao(versao_dados)
+    pares_cursos = [(curso['idCurso'], curso['Curso']) for curso in manifesto['cursos'] if curso['Curso'] is not None]
+else:
+    versao_dados = versao_snapshot()
+    pasta_dados = None
+    memo.manter_versao(versao_dados)
+    df_cursos, df_disciplinas, relatorio_tabelas, avisos_carga = load_data(versao_dados)
+    
+    if df_cursos is None or df_disciplinas is None:
+        st.stop()
+    pares_cursos = df_cursos.dropna(subset=['Curso']).drop_duplicates('Curso')[['idCurso', 'Curso']].itertuples(index=False)
 
-if df_cursos is None or df_disciplinas is None:
-    st.stop()
+# Nome do curso -> idCurso (o menor id, se o nome se repetir)
+ids_cursos = {}
+for id_curso_par, nome_curso in pares_cursos:
+    ids_cursos.setdefault(nome_curso, int(id_curso_par))
 
 # Sidebar
 st.sidebar.title("📊 Dashboard Educacional")
@@ -154,55 +376,121 @@ st.sidebar.markdown("---")
 st.sidebar.header("🔍 Filtros")
 
 # Filtro de curso
-cursos_disponiveis = ['Todos'] + sorted(df_cursos['Curso'].dropna().unique().tolist())
+cursos_disponiveis = ['Todos'] + sorted(ids_cursos)
 curso_selecionado = st.sidebar.selectbox("Selecione o Curso:", cursos_disponiveis)
 
-# Aplicar filtros
-df_cursos_filtrado = df_cursos.copy()
-df_disciplinas_filtrado = df_disciplinas.copy()
-
-if curso_selecionado != 'Todos':
-    df_cursos_filtrado = df_cursos_filtrado[df_cursos_filtrado['Curso'] == curso_selecionado]
-    # Filtrar disciplinas pelos IDs de alunos do curso selecionado
-    alunos_ids = df_cursos_filtrado['idAluno'].unique()
-    df_disciplinas_filtrado = df_disciplinas_filtrado[df_disciplinas_filtrado['idAluno'].isin(alunos_ids)]
+id_curso = None if curso_selecionado == 'Todos' else ids_cursos[curso_selecionado]
 
 st.sidebar.markdown("---")
 st.sidebar.info("💡 Use o filtro acima para visualizar dados por curso específico ou veja todos os cursos")
 
+# Parâmetros de análise ajustáveis (os valores do config.py são o ponto de partida; os limites
+# abertos crescem até o valor configurado para que o slider nunca receba um padrão fora da faixa)
+with st.sidebar.expander("⚙️ Parâmetros de Análise"):
+    DIAS_MINIMOS_ABANDONO = st.slider(
+        "Dias mínimos desde a liberação", 1, max(365, DIAS_MINIMOS_ABANDONO), DIAS_MINIMOS_ABANDONO,
+        key="param_dias_minimos_abandono",
+        help="Disciplinas liberadas há menos tempo não entram na análise de engajamento"
+    )
+    PERCENTUAL_MAXIMO_ABANDONO = st.slider(
+        "Percentual máximo para abandono (%)", 1, 100, min(max(PERCENTUAL_MAXIMO_ABANDONO, 1), 100),
+        key="param_percentual_maximo_abandono"
+    )
+    ABANDONO_INICIAL_PERCENTUAL = st.slider(
+        "Abandono inicial abaixo de (%)", 1, 100, min(max(ABANDONO_INICIAL_PERCENTUAL, 1), 100),
+        key="param_abandono_inicial_percentual"
+    )
+    MIN_AVALIACOES_NOTA = st.slider(
+        "Mínimo de avaliações/conclusões nos rankings", 1, max(100, MIN_AVALIACOES_NOTA), MIN_AVALIACOES_NOTA,
+        key="param_min_avaliacoes_nota"
+    )
+    MIN_MATRICULAS_TAXA = st.slider(
+        "Mínimo de matrículas para taxa de conclusão", 1, max(200, MIN_MATRICULAS_TAXA), MIN_MATRICULAS_TAXA,
+        key="param_min_matriculas_taxa"
+    )
+    TOP_N_CURSOS = st.slider("Top N cursos", 1, max(50, TOP_N_CURSOS), TOP_N_CURSOS, key="param_top_n_cursos")
+    # Os placares guardam no máximo CAPACIDADE_PLACAR disciplinas, então aqui o padrão é que se ajusta
+    TOP_N_DISCIPLINAS = st.slider("Top N disciplinas", 1, CAPACIDADE_PLACAR, min(TOP_N_DISCIPLINAS, CAPACIDADE_PLACAR),
+                                  key="param_top_n_disciplinas")
+    TOP_N_DISCIPLINAS_ACESSO = st.slider(
+        "Top N disciplinas (acessos/taxa)", 1, CAPACIDADE_PLACAR, min(TOP_N_DISCIPLINAS_ACESSO, CAPACIDADE_PLACAR),
+        key="param_top_n_disciplinas_acesso"
+    )
+
 # Título principal
 st.title("📊 Dashboard Educacional")
 st.markdown("---")
 
+# Problemas da carga que não a interromperam (ex.: IDs inválidos tratados como vazios)
+for aviso in avisos_carga:
+    st.warning(f"⚠️ {aviso}")
+
 # Menu de navegação
 menu = st.sidebar.radio(
     "Navegação:",
-    ["📈 Visão Geral", "👥 Análise de Alunos", "📚 Análise de Disciplinas", "📊 Dados Detalhados"]
+    ["📈 Visão Geral", "👥 Análise de Alunos", "📚 Análise de Disciplinas", "🗺️ Mapa de Alunos", "📊 Dados Detalhados"]
 )
 
+# Aplicar filtros
+if USAR_PARTICOES:
+    # A Visão Geral usa só o manifesto; as demais páginas leem a partição do curso
+    # (ou todas as partições, em "Todos")
+    df_cursos = df_disciplinas = relatorio_tabelas = None
+    df_cursos_filtrado = df_disciplinas_filtrado = None
+    if menu != "📈 Visão Geral":
+        if id_curso is None:
+            df_cursos, df_disciplinas, relatorio_tabelas, _ = load_data(versao_dados)
+            if df_cursos is None or df_disciplinas is None:
+                st.stop()
+            df_cursos_filtrado, df_disciplinas_filtrado = df_cursos, df_disciplinas
+        else:
+            df_cursos_filtrado, df_disciplinas_filtrado, relatorio_tabelas = carregar_curso(versao_dados, id_curso,
+                                                                                            pasta_dados)
+elif id_curso is None:
+    df_cursos_filtrado = df_cursos
+    df_disciplinas_filtrado = df_disciplinas
+else:
+    # Ambas as tabelas estão ordenadas por idCurso: o curso é uma fatia contígua
+    # (apenas as disciplinas vinculadas às matrículas deste curso), sem cópia das
+    # tabelas compartilhadas de load_data
+    df_cursos_filtrado, df_disciplinas_filtrado = memo.obter(
+        (versao_dados, id_curso, 'filtradas'),
+        lambda: (fatiar_curso(df_cursos, id_curso), fatiar_curso(df_disciplinas, id_curso)),
+        depende_de=(versao_dados, None, 'tabelas'))
+
 # ============================================
 # PÁGINA 1: VISÃO GERAL
 # ============================================
 if menu == "📈 Visão Geral":
     st.header("📈 Visão Geral")
+    px = importar_graficos()
+    
+    # Agregados da página: prontos no manifesto (modo particionado) ou calculados das matrículas do filtro
+    if not USAR_PARTICOES:
+        visao = memo.obter((versao_dados, id_curso, 'visao_geral'),
+                           lambda: visao_geral(versao_dados, id_curso, df_cursos_filtrado))
+    elif id_curso is None:
+        visao = manifesto['todos']
+    else:
+        visao = next(curso['visao_geral'] for curso in manifesto['cursos'] if curso['idCurso'] == id_curso)
     
     # Métricas principais
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        alunos_ativos = df_cursos_filtrado[df_cursos_filtrado['Aluno Ativo'] == 'Sim']['idAluno'].nunique()
+        alunos_ativos = visao['alunos_ativos']
         st.metric("👤 Alunos Ativos", f"{alunos_ativos:,}")
     
     with col2:
-        total_matriculas = len(df_cursos_filtrado)
+        total_matriculas = visao['matriculas']
         st.metric("📝 Total de Matrículas", f"{total_matriculas:,}")
     
     with col3:
-        alunos_inativos = df_cursos_filtrado[df_cursos_filtrado['Aluno Ativo'] == 'Não']['idAluno'].nunique()
+        alunos_inativos = visao['alunos_inativos']
         st.metric("⛔ Alunos Inativos", f"{alunos_inativos:,}")
     
     with col4:
-        cursos_unicos = df_cursos_filtrado['Curso'].nunique()
+        cursos_unicos = visao['cursos']
         st.metric("🎓 Cursos Disponíveis", f"{cursos_unicos:,}")
     
     st.markdown("---")
@@ -212,7 +500,7 @@ if menu == "📈 Visão Geral":
     
     with col1:
         st.subheader("📊 Distribuição de Alunos por Status")
-        status_counts = df_cursos_filtrado['Aluno Ativo'].value_counts()
+        status_counts = pd.Series(visao['status'], dtype='int64')
         fig = px.pie(values=status_counts.values, 
                      names=status_counts.index,
                      title="Alunos Ativos vs Inativos",
@@ -220,8 +508,8 @@ if menu == "📈 Visão Geral":
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
-        st.subheader("📊 Top 10 Cursos por Matrículas")
-        top_cursos = df_cursos_filtrado['Curso'].value_counts().head(TOP_N_CURSOS)
+        st.subheader(f"📊 Top {TOP_N_CURSOS} Cursos por Matrículas")
+        top_cursos = pd.Series(visao['matriculas_curso'], dtype='int64').head(TOP_N_CURSOS)
         fig = px.bar(x=top_cursos.values, 
                      y=top_cursos.index,
                      orientation='h',
@@ -237,10 +525,8 @@ if menu == "📈 Visão Geral":
     # Evolução temporal
     st.subheader("📈 Evolução de Matrículas Mês a Mês")
     
-    df_temp = df_cursos_filtrado[df_cursos_filtrado['Data Matrícula'].notna()].copy()
-    df_temp['Ano-Mês'] = df_temp['Data Matrícula'].dt.to_period('M').astype(str)
-    
-    matriculas_mes = df_temp.groupby('Ano-Mês').size().reset_index(name='Matrículas')
+    matriculas_mes = pd.DataFrame({'Ano-Mês': list(visao['matriculas_mes']),
+                                   'Matrículas': list(visao['matriculas_mes'].values())})
     
     fig = px.line(matriculas_mes, 
                   x='Ano-Mês', 
@@ -255,14 +541,9 @@ if menu == "📈 Visão Geral":
     # Evolução de cancelamentos
     st.subheader("📉 Evolução de Cancelamentos Mês a Mês")
     
-    df_cancelados = df_cursos_filtrado[
-        (df_cursos_filtrado['Aluno Ativo'] == 'Não') & 
-        (df_cursos_filtrado['Data Matrícula'].notna())
-    ].copy()
-    
-    if len(df_cancelados) > 0:
-        df_cancelados['Ano-Mês'] = df_cancelados['Data Matrícula'].dt.to_period('M').astype(str)
-        cancelamentos_mes = df_cancelados.groupby('Ano-Mês').size().reset_index(name='Cancelamentos')
+    if len(visao['cancelamentos_mes']) > 0:
+        cancelamentos_mes = pd.DataFrame({'Ano-Mês': list(visao['cancelamentos_mes']),
+                                          'Cancelamentos': list(visao['cancelamentos_mes'].values())})
         
         fig = px.line(cancelamentos_mes, 
                       x='Ano-Mês', 
@@ -280,6 +561,7 @@ if menu == "📈 Visão Geral":
 # ============================================
 elif menu == "👥 Análise de Alunos":
     st.header("👥 Análise Detalhada de Alunos")
+    px = importar_graficos()
     
     # Alunos ativos por curso
     st.subheader("👤 Quantidade de Alunos Ativos por Curso")
@@ -373,26 +655,116 @@ elif menu == "👥 Análise de Alunos":
     with col3:
         taxa_cancelamento = (inativos / total_alunos * 100) if total_alunos > 0 else 0
         st.metric("Taxa de Cancelamento", f"{taxa_cancelamento:.1f}%", delta=None)
+    
+    st.markdown("---")
+    
+    # Retenção por coorte (mês da matrícula x meses desde a matrícula)
+    st.subheader("🧭 Retenção por Coorte de Matrícula")
+    st.caption("Percentual de matrículas de cada mês com atividade (último acesso ao curso ou a uma disciplina) "
+               "pelo menos N meses após a matrícula")
+    
+    status_coorte = st.radio("Alunos:", ["Todos", "Ativos", "Inativos"], horizontal=True, key="coorte_status")
+    if df_cursos is not None:
+        estado_coortes = coortes_do_snapshot(versao_dados, df_cursos, df_disciplinas)
+    else:
+        # Modo particionado com um curso: coortes apenas da partição carregada
+        estado_coortes = coortes_curso(versao_dados, id_curso, manifesto['mes_snapshot'],
+                                       df_cursos_filtrado, df_disciplinas_filtrado)
+    matriz = matriz_retencao(estado_coortes,
+                             id_curso=id_curso,
+                             ativo={'Todos': None, 'Ativos': True, 'Inativos': False}[status_coorte])
+    
+    if len(matriz) > 0:
+        fig = px.imshow(matriz.drop(columns='Matrículas'),
+                        text_auto='.0f',
+                        aspect='auto',
+                        color_continuous_scale=CORES['positivo'],
+                        labels={'x': 'Meses desde a matrícula', 'y': 'Coorte', 'color': 'Retenção (%)'},
+                        title="Retenção por Coorte (%)")
+        fig.update_xaxes(side='top', dtick=1)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        with st.expander("📋 Ver tabela de coortes"):
+            # Rótulos em texto: a coluna 'Matrículas' ao lado dos deslocamentos inteiros confunde o Arrow
+            st.dataframe(matriz.round(1).rename(columns=str), use_container_width=True)
+    else:
+        st.info("Não há matrículas com data para montar as coortes")
+    
+    st.markdown("---")
+    
+    # Risco de evasão por aluno
+    st.subheader("🚨 Alunos com Maior Risco de Evasão")
+    st.caption(f"Pontuação (0-100) a partir das disciplinas liberadas há mais de {DIAS_MINIMOS_ABANDONO} dias: "
+               "não iniciadas, apenas visualizadas, abandonadas, concluídas, percentual médio e dias sem acesso")
+    
+    # A data de referência fica fora da chave: na virada do dia a entrada é recalculada, não acumulada
+    hoje = date.today()
+    ranking = memo.obter((versao_dados, id_curso, 'risco', DIAS_MINIMOS_ABANDONO, PERCENTUAL_MAXIMO_ABANDONO),
+                         lambda: risco_evasao(versao_dados, id_curso, DIAS_MINIMOS_ABANDONO, PERCENTUAL_MAXIMO_ABANDONO,
+                                              hoje, df_disciplinas_filtrado, df_cursos_filtrado),
+                         marca=hoje)
+    
+    if len(ranking) > 0:
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            risco_minimo = st.slider("Risco mínimo", 0, 100, 50, key="risco_minimo")
+            limite_linhas = st.number_input("Máximo de alunos exibidos", 10, 10_000, 500, step=100,
+                                            key="risco_limite_linhas")
+        with col2:
+            em_risco = ranking[ranking['Risco'] >= risco_minimo]
+            st.metric("Alunos com risco acima do mínimo", f"{len(em_risco):,}",
+                      help=f"{len(em_risco) / len(ranking) * 100:.1f}% dos alunos com disciplinas liberadas")
+        
+        # Tabela ordenável (clique no cabeçalho para reordenar)
+        st.dataframe(
+            em_risco.head(int(limite_linhas)),
+            use_container_width=True,
+            height=400,
+            hide_index=True,
+            column_config={
+                'Risco': st.column_config.ProgressColumn('Risco', format='%.0f', min_value=0, max_value=100),
+                'Percentual Médio': st.column_config.NumberColumn('Percentual Médio', format='%.1f%%'),
+            }
+        )
+    else:
+        st.info("Não há alunos com disciplinas liberadas para calcular o risco")
 
 # ============================================
 # PÁGINA 3: ANÁLISE DE DISCIPLINAS
 # ============================================
 elif menu == "📚 Análise de Disciplinas":
     st.header("📚 Análise Detalhada de Disciplinas")
+    px = importar_graficos()
+    
+    # Arrays intermediários do curso (calculados uma vez por versão dos dados);
+    # os parâmetros da barra lateral apenas recortam estes arrays
+    if USAR_PARTICOES:
+        nomes = nomes_do_manifesto(manifesto)
+        compartilhadas = compartilhadas_do_manifesto(manifesto)
+    else:
+        nomes = catalogo_disciplinas(versao_dados, df_disciplinas)
+        compartilhadas = compartilhadas_snapshot(versao_dados, len(nomes), df_disciplinas)
+    intermediarios = intermediarios_disciplinas(versao_dados, id_curso, df_disciplinas_filtrado, len(nomes))
+    resumo = intermediarios['resumo']
+    # Rankings já ordenados: placar do curso ou mescla dos placares dos cursos em "Todos"
+    if id_curso is None:
+        placar = placar_todos(versao_dados, MIN_AVALIACOES_NOTA, MIN_MATRICULAS_TAXA,
+                              df_disciplinas, len(nomes), compartilhadas)
+    else:
+        placar = placar_curso(versao_dados, id_curso, MIN_AVALIACOES_NOTA, MIN_MATRICULAS_TAXA,
+                              resumo, compartilhadas)
+    # Esboços de quantis por (curso, disciplina): medianas e percentis sem voltar às linhas
+    esbocos = esbocos_snapshot(versao_dados, pasta_dados, df_disciplinas)
     
     # Notas médias por disciplina
     st.subheader("📊 Notas Médias por Disciplina")
     
-    # Filtrar disciplinas com notas
-    df_com_notas = df_disciplinas_filtrado[df_disciplinas_filtrado['Nota de Aproveitamento Final'].notna()].copy()
+    # Nota média e quantidade de avaliações das disciplinas com notas
+    notas_por_disciplina = tabela_notas(resumo, nomes)
     
-    if len(df_com_notas) > 0:
-        notas_por_disciplina = df_com_notas.groupby('Disciplina')['Nota de Aproveitamento Final'].agg(['mean', 'count']).reset_index()
-        notas_por_disciplina.columns = ['Disciplina', 'Nota Média', 'Quantidade de Avaliações']
-        notas_por_disciplina = notas_por_disciplina.sort_values('Nota Média', ascending=False)
-        
+    if len(notas_por_disciplina) > 0:
         # Top 20 disciplinas por nota média (com pelo menos X avaliações)
-        top_notas = notas_por_disciplina[notas_por_disciplina['Quantidade de Avaliações'] >= MIN_AVALIACOES_NOTA].head(TOP_N_DISCIPLINAS)
+        top_notas = ranking_notas(placar, nomes, TOP_N_DISCIPLINAS)
         
         fig = px.bar(top_notas, 
                      x='Nota Média', 
@@ -405,11 +777,19 @@ elif menu == "📚 Análise de Disciplinas":
         fig.update_layout(yaxis={'categoryorder':'total ascending'})
         st.plotly_chart(fig, use_container_width=True)
         
-        # Tabela detalhada
+        # Tabela detalhada (barra nativa do Streamlit em vez de Styler, que carrega o matplotlib)
         with st.expander("📋 Ver tabela completa de notas por disciplina"):
             st.dataframe(
-                notas_por_disciplina.style.background_gradient(subset=['Nota Média'], cmap='RdYlGn'),
-                use_container_width=True
+                notas_por_disciplina,
+                use_container_width=True,
+                column_config={
+                    'Nota Média': st.column_config.ProgressColumn(
+                        'Nota Média',
+                        format='%.2f',
+                        min_value=0,
+                        max_value=float(max(notas_por_disciplina['Nota Média'].max(), 1))
+                    )
+                }
             )
     else:
         st.warning("Não há dados de notas disponíveis para o filtro selecionado")
@@ -419,12 +799,9 @@ elif menu == "📚 Análise de Disciplinas":
     # Disciplinas mais concluídas
     st.subheader("✅ Disciplinas Mais Concluídas")
     
-    df_concluidas = df_disciplinas_filtrado[df_disciplinas_filtrado['Percentual Concluído'] == 100].copy()
+    conclusoes_por_disciplina = ranking_placar(placar, 'conclusoes', nomes, TOP_N_DISCIPLINAS, 'Conclusões')
     
-    if len(df_concluidas) > 0:
-        conclusoes_por_disciplina = df_concluidas['Disciplina'].value_counts().head(TOP_N_DISCIPLINAS).reset_index()
-        conclusoes_por_disciplina.columns = ['Disciplina', 'Conclusões']
-        
+    if len(conclusoes_por_disciplina) > 0:
         fig = px.bar(conclusoes_por_disciplina, 
                      x='Conclusões', 
                      y='Disciplina',
@@ -450,33 +827,18 @@ elif menu == "📚 Análise de Disciplinas":
     # Considerar apenas disciplinas liberadas há mais de X dias (configurável)
     data_limite = datetime.now() - timedelta(days=DIAS_MINIMOS_ABANDONO)
     
-    # Filtro base: disciplinas liberadas há mais de X dias e sem término
-    df_base = df_disciplinas_filtrado[
-        (df_disciplinas_filtrado['Liberado a Partir De'].notna()) &
-        (pd.to_datetime(df_disciplinas_filtrado['Liberado a Partir De'], errors='coerce') < data_limite) &
-        (df_disciplinas_filtrado['Data Término'].isna()) &
-        (df_disciplinas_filtrado['Percentual Concluído'] < PERCENTUAL_MAXIMO_ABANDONO)
-    ].copy()
-    
-    if len(df_base) > 0:
-        # Categoria 1: NÃO INICIADAS (0% e nunca acessou)
-        df_nao_iniciadas = df_base[
-            (df_base['Percentual Concluído'] == 0) & 
-            (df_base['Último Acesso'].isna())
-        ].copy()
-        
-        # Categoria 2: VISUALIZADAS APENAS (0% mas acessou)
-        df_visualizadas = df_base[
-            (df_base['Percentual Concluído'] == 0) & 
-            (df_base['Último Acesso'].notna())
-        ].copy()
-        
-        # Categoria 3: ABANDONADAS (começou mas parou - >0% e <50%)
-        df_abandonadas_real = df_base[
-            (df_base['Percentual Concluído'] > 0) & 
-            (df_base['Percentual Concluído'] < PERCENTUAL_MAXIMO_ABANDONO)
-        ].copy()
-        
+    # Base: disciplinas liberadas há mais de X dias, sem término e abaixo do percentual máximo,
+    # separadas em: NÃO INICIADAS (0% e nunca acessou), VISUALIZADAS APENAS (0% mas acessou)
+    # e ABANDONADAS (começou mas parou - >0% e abaixo do percentual máximo)
+    engajamento = classificar_engajamento(intermediarios['engajamento'], data_limite,
+                                          PERCENTUAL_MAXIMO_ABANDONO, len(nomes))
+    total_base = engajamento['total']
+    total_nao_iniciadas = engajamento['total_nao_iniciadas']
+    total_visualizadas = engajamento['total_visualizadas']
+    total_abandonadas = engajamento['total_abandonadas']
+    histograma_abandonadas = engajamento['histograma_abandonadas']
+    
+    if total_base > 0:
         # Mostrar resumo em cards
         st.info(f"💡 **Análise de disciplinas liberadas há mais de {DIAS_MINIMOS_ABANDONO} dias** (antes de {data_limite.strftime('%d/%m/%Y')}) e com menos de {PERCENTUAL_MAXIMO_ABANDONO}% de conclusão.")
         
@@ -485,22 +847,22 @@ elif menu == "📚 Análise de Disciplinas":
         with col1:
             st.metric(
                 "🔴 Não Iniciadas", 
-                f"{len(df_nao_iniciadas):,}",
+                f"{total_nao_iniciadas:,}",
                 help="Disciplinas liberadas mas nunca acessadas pelo aluno"
             )
         
         with col2:
             st.metric(
                 "🟡 Apenas Visualizadas", 
-                f"{len(df_visualizadas):,}",
+                f"{total_visualizadas:,}",
                 help="Aluno acessou mas não começou (0% concluído)"
             )
         
         with col3:
             st.metric(
                 "🟠 Abandonadas", 
-                f"{len(df_abandonadas_real):,}",
-                help="Aluno começou mas abandonou (>0% e <50% concluído)"
+                f"{total_abandonadas:,}",
+                help=f"Aluno começou mas abandonou (>0% e <{PERCENTUAL_MAXIMO_ABANDONO}% concluído)"
             )
         
         st.markdown("---")
@@ -513,9 +875,8 @@ elif menu == "📚 Análise de Disciplinas":
             st.subheader("Disciplinas Não Iniciadas")
             st.caption("Disciplinas que foram liberadas mas o aluno nunca acessou")
             
-            if len(df_nao_iniciadas) > 0:
-                nao_iniciadas_ranking = df_nao_iniciadas['Disciplina'].value_counts().head(TOP_N_DISCIPLINAS).reset_index()
-                nao_iniciadas_ranking.columns = ['Disciplina', 'Quantidade']
+            if total_nao_iniciadas > 0:
+                nao_iniciadas_ranking = ranking_contagem(engajamento['nao_iniciadas'], nomes, TOP_N_DISCIPLINAS)
                 
                 fig = px.bar(nao_iniciadas_ranking, 
                              x='Quantidade', 
@@ -533,7 +894,7 @@ elif menu == "📚 Análise de Disciplinas":
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Estatísticas
-                pct_nao_iniciadas = (len(df_nao_iniciadas) / len(df_base) * 100) if len(df_base) > 0 else 0
+                pct_nao_iniciadas = (total_nao_iniciadas / total_base * 100) if total_base > 0 else 0
                 st.info(f"📊 **{pct_nao_iniciadas:.1f}%** das disciplinas elegíveis nunca foram iniciadas")
             else:
                 st.success("✅ Todas as disciplinas foram pelo menos acessadas!")
@@ -543,9 +904,8 @@ elif menu == "📚 Análise de Disciplinas":
             st.subheader("Disciplinas Apenas Visualizadas")
             st.caption("Aluno acessou a disciplina mas não iniciou o conteúdo (0% de conclusão)")
             
-            if len(df_visualizadas) > 0:
-                visualizadas_ranking = df_visualizadas['Disciplina'].value_counts().head(TOP_N_DISCIPLINAS).reset_index()
-                visualizadas_ranking.columns = ['Disciplina', 'Quantidade']
+            if total_visualizadas > 0:
+                visualizadas_ranking = ranking_contagem(engajamento['visualizadas'], nomes, TOP_N_DISCIPLINAS)
                 
                 fig = px.bar(visualizadas_ranking, 
                              x='Quantidade', 
@@ -563,7 +923,7 @@ elif menu == "📚 Análise de Disciplinas":
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Estatísticas
-                pct_visualizadas = (len(df_visualizadas) / len(df_base) * 100) if len(df_base) > 0 else 0
+                pct_visualizadas = (total_visualizadas / total_base * 100) if total_base > 0 else 0
                 st.warning(f"⚠️ **{pct_visualizadas:.1f}%** das disciplinas foram apenas visualizadas sem início efetivo")
                 
                 # Insight adicional
@@ -574,11 +934,10 @@ elif menu == "📚 Análise de Disciplinas":
         # TAB 3: ABANDONADAS (REAL)
         with tab3:
             st.subheader("Disciplinas Abandonadas")
-            st.caption("Aluno começou a disciplina mas abandonou antes de completar 50%")
+            st.caption(f"Aluno começou a disciplina mas abandonou antes de completar {PERCENTUAL_MAXIMO_ABANDONO}%")
             
-            if len(df_abandonadas_real) > 0:
-                abandonadas_ranking = df_abandonadas_real['Disciplina'].value_counts().head(TOP_N_DISCIPLINAS).reset_index()
-                abandonadas_ranking.columns = ['Disciplina', 'Abandonos']
+            if total_abandonadas > 0:
+                abandonadas_ranking = ranking_contagem(engajamento['abandonadas'], nomes, TOP_N_DISCIPLINAS, 'Abandonos')
                 
                 fig = px.bar(abandonadas_ranking, 
                              x='Abandonos', 
@@ -598,15 +957,14 @@ elif menu == "📚 Análise de Disciplinas":
                 # Análise do momento de abandono
                 st.subheader("📉 Momento do Abandono")
                 
-                # Criar faixas mais significativas
-                df_abandonadas_real['Faixa de Abandono'] = pd.cut(
-                    df_abandonadas_real['Percentual Concluído'], 
-                    bins=[0, 10, 20, 30, 40, 50],
-                    labels=['1-10%', '11-20%', '21-30%', '31-40%', '41-50%']
-                )
-                
-                faixas_abandono = df_abandonadas_real['Faixa de Abandono'].value_counts().sort_index().reset_index()
-                faixas_abandono.columns = ['Faixa', 'Quantidade']
+                # Criar faixas de 10 pontos até o percentual máximo de abandono
+                # (somas de baldes do esboço: exatas para limites inteiros)
+                limites_faixas = list(range(0, PERCENTUAL_MAXIMO_ABANDONO, 10)) + [PERCENTUAL_MAXIMO_ABANDONO]
+                faixas_abandono = pd.DataFrame({
+                    'Faixa': [f'{inicio + 1}-{fim}%' for inicio, fim in zip(limites_faixas[:-1], limites_faixas[1:])],
+                    'Quantidade': [int(histograma_abandonadas[intervalo_percentual(inicio, fim)].sum())
+                                   for inicio, fim in zip(limites_faixas[:-1], limites_faixas[1:])],
+                })
                 
                 fig = px.bar(faixas_abandono, 
                             x='Faixa', 
@@ -622,20 +980,21 @@ elif menu == "📚 Análise de Disciplinas":
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    media_abandono = df_abandonadas_real['Percentual Concluído'].mean()
+                    media_abandono = engajamento['soma_abandonadas'] / total_abandonadas
                     st.metric("Média de Conclusão ao Abandonar", f"{media_abandono:.1f}%")
                 
                 with col2:
-                    mediana_abandono = df_abandonadas_real['Percentual Concluído'].median()
+                    mediana_abandono = quantis_histograma(histograma_abandonadas, 'percentual', (0.5,))[0]
                     st.metric("Mediana de Conclusão ao Abandonar", f"{mediana_abandono:.1f}%")
                 
                 with col3:
-                    abandono_inicial = len(df_abandonadas_real[df_abandonadas_real['Percentual Concluído'] < ABANDONO_INICIAL_PERCENTUAL])
-                    pct_abandono_inicial = (abandono_inicial / len(df_abandonadas_real) * 100) if len(df_abandonadas_real) > 0 else 0
+                    abandono_inicial = int(histograma_abandonadas[
+                        intervalo_percentual(0, ABANDONO_INICIAL_PERCENTUAL, incluir_maximo=False)].sum())
+                    pct_abandono_inicial = (abandono_inicial / total_abandonadas * 100) if total_abandonadas > 0 else 0
                     st.metric(f"Abandonos Iniciais (< {ABANDONO_INICIAL_PERCENTUAL}%)", f"{pct_abandono_inicial:.1f}%")
                 
                 # Insight
-                pct_abandonadas = (len(df_abandonadas_real) / len(df_base) * 100) if len(df_base) > 0 else 0
+                pct_abandonadas = (total_abandonadas / total_base * 100) if total_base > 0 else 0
                 st.error(f"🚨 **{pct_abandonadas:.1f}%** das disciplinas foram iniciadas mas abandonadas antes de completar {PERCENTUAL_MAXIMO_ABANDONO}%")
                 
             else:
@@ -648,7 +1007,7 @@ elif menu == "📚 Análise de Disciplinas":
         
         distribuicao = pd.DataFrame({
             'Status': ['Não Iniciadas', 'Visualizadas Apenas', 'Abandonadas'],
-            'Quantidade': [len(df_nao_iniciadas), len(df_visualizadas), len(df_abandonadas_real)]
+            'Quantidade': [total_nao_iniciadas, total_visualizadas, total_abandonadas]
         })
         
         fig = px.pie(distribuicao, 
@@ -677,12 +1036,9 @@ elif menu == "📚 Análise de Disciplinas":
     
     with col1:
         # Disciplinas com mais acessos (baseado em último acesso recente)
-        df_acessos = df_disciplinas_filtrado[df_disciplinas_filtrado['Último Acesso'].notna()].copy()
+        acessos_por_disciplina = ranking_placar(placar, 'acessos', nomes, TOP_N_DISCIPLINAS_ACESSO, 'Total de Acessos')
         
-        if len(df_acessos) > 0:
-            acessos_por_disciplina = df_acessos.groupby('Disciplina').size().sort_values(ascending=False).head(TOP_N_DISCIPLINAS_ACESSO).reset_index()
-            acessos_por_disciplina.columns = ['Disciplina', 'Total de Acessos']
-            
+        if len(acessos_por_disciplina) > 0:
             fig = px.bar(acessos_por_disciplina, 
                          y='Disciplina', 
                          x='Total de Acessos',
@@ -697,12 +1053,8 @@ elif menu == "📚 Análise de Disciplinas":
     
     with col2:
         # Taxa de conclusão por disciplina (top 15)
-        df_temp = df_disciplinas_filtrado.groupby('Disciplina').agg({
-            'Percentual Concluído': 'mean',
-            'idAluno': 'count'
-        }).reset_index()
-        df_temp.columns = ['Disciplina', 'Taxa Média de Conclusão', 'Total de Matrículas']
-        df_temp = df_temp[df_temp['Total de Matrículas'] >= MIN_MATRICULAS_TAXA].sort_values('Taxa Média de Conclusão', ascending=False).head(TOP_N_DISCIPLINAS_ACESSO)
+        df_temp = ranking_taxa_conclusao(placar, nomes, TOP_N_DISCIPLINAS_ACESSO,
+                                         quantis_disciplinas(versao_dados, id_curso, 'percentual', esbocos))
         
         if len(df_temp) > 0:
             fig = px.bar(df_temp, 
@@ -712,7 +1064,7 @@ elif menu == "📚 Análise de Disciplinas":
                          title=f"Top {TOP_N_DISCIPLINAS_ACESSO} Disciplinas por Taxa Média de Conclusão",
                          color='Taxa Média de Conclusão',
                          color_continuous_scale=CORES['positivo'],
-                         hover_data=['Total de Matrículas'])
+                         hover_data={'Total de Matrículas': True, 'Mediana de Conclusão': ':.1f'})
             fig.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
         else:
@@ -723,21 +1075,35 @@ elif menu == "📚 Análise de Disciplinas":
     # Tempo médio de conclusão
     st.subheader("⏱️ Tempo Médio de Conclusão das Disciplinas")
     
-    df_tempo = df_disciplinas_filtrado[
-        (df_disciplinas_filtrado['Data Início'].notna()) & 
-        (df_disciplinas_filtrado['Data Término'].notna())
-    ].copy()
-    
-    if len(df_tempo) > 0:
-        df_tempo['Dias para Conclusão'] = (df_tempo['Data Término'] - df_tempo['Data Início']).dt.days
-        df_tempo = df_tempo[df_tempo['Dias para Conclusão'] >= 0]  # Remover valores negativos
+    if resumo['com_dias'].sum() > 0:
+        # Distribuição dos dias até a conclusão, combinando os esboços das disciplinas do filtro
+        histograma_dias = histograma_esboco(recortar_esboco(esbocos['dias'], id_curso), 'dias')
+        mediana_dias, p90_dias = quantis_histograma(histograma_dias, 'dias', (0.5, 0.9))
         
-        tempo_por_disciplina = df_tempo.groupby('Disciplina').agg({
-            'Dias para Conclusão': ['mean', 'count']
-        }).reset_index()
-        tempo_por_disciplina.columns = ['Disciplina', 'Média de Dias', 'Quantidade']
-        tempo_por_disciplina = tempo_por_disciplina[tempo_por_disciplina['Quantidade'] >= MIN_AVALIACOES_NOTA]
-        tempo_por_disciplina = tempo_por_disciplina.sort_values('Média de Dias').head(TOP_N_DISCIPLINAS)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Média de Dias", f"{resumo['soma_dias'].sum() / resumo['com_dias'].sum():.1f}")
+        with col2:
+            st.metric("Mediana de Dias", f"{mediana_dias:.1f}")
+        with col3:
+            st.metric("90% Concluem em Até", f"{p90_dias:.0f} dias")
+        
+        distribuicao_dias = pd.DataFrame({
+            'Faixa': [rotulo for rotulo, _ in faixas_dias()],
+            'Quantidade': [int(histograma_dias[baldes].sum()) for _, baldes in faixas_dias()],
+        })
+        fig = px.bar(distribuicao_dias,
+                     x='Faixa',
+                     y='Quantidade',
+                     title="Distribuição do Tempo de Conclusão",
+                     labels={'Faixa': 'Dias até a Conclusão', 'Quantidade': 'Conclusões'},
+                     color='Quantidade',
+                     color_continuous_scale=CORES['geral'])
+        fig.update_layout(showlegend=False)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        tempo_por_disciplina = ranking_tempo_conclusao(placar, nomes, TOP_N_DISCIPLINAS,
+                                                       quantis_disciplinas(versao_dados, id_curso, 'dias', esbocos))
         
         if len(tempo_por_disciplina) > 0:
             fig = px.bar(tempo_por_disciplina, 
@@ -747,7 +1113,7 @@ elif menu == "📚 Análise de Disciplinas":
                          title=f"Top {TOP_N_DISCIPLINAS} Disciplinas por Tempo Médio de Conclusão (mínimo {MIN_AVALIACOES_NOTA} conclusões)",
                          color='Média de Dias',
                          color_continuous_scale=CORES['geral'],
-                         hover_data=['Quantidade'])
+                         hover_data={'Quantidade': True, 'Mediana de Dias': ':.1f', 'P90 de Dias': ':.1f'})
             fig.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
         else:
@@ -756,12 +1122,97 @@ elif menu == "📚 Análise de Disciplinas":
         st.info("Não há dados de tempo de conclusão disponíveis")
 
 # ============================================
-# PÁGINA 4: DADOS DETALHADOS
+# PÁGINA 4: MAPA DE ALUNOS
+# ============================================
+elif menu == "🗺️ Mapa de Alunos":
+    st.header("🗺️ Distribuição Geográfica dos Alunos")
+    px = importar_graficos()
+    
+    # Posições preparadas uma vez por curso; cada combinação de filtros só agrega células
+    geografia = geografia_curso(versao_dados, id_curso, df_cursos_filtrado)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        nivel = st.selectbox("Nível de detalhe:", list(NIVEIS), key="mapa_nivel")
+    with col2:
+        uf_mapa = st.selectbox("Estado:", ['Todos'] + sorted(geografia['nomes_uf']), key="mapa_uf",
+                               help="Escolha um estado para aproximar o mapa e detalhar por município ou grade")
+    with col3:
+        status_mapa = st.radio("Alunos:", ["Todos", "Ativos", "Inativos"], horizontal=True, key="mapa_status")
+    
+    filtros_mapa = (nivel, {'Todos': None, 'Ativos': True, 'Inativos': False}[status_mapa],
+                    None if uf_mapa == 'Todos' else uf_mapa)
+    celulas, sem_municipio = memo.obter((versao_dados, id_curso, 'celulas') + filtros_mapa,
+                                        lambda: celulas_mapa(versao_dados, id_curso, *filtros_mapa, geografia))
+    
+    if len(celulas) > 0:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📍 Matrículas no Mapa", f"{int(celulas['Matrículas'].sum()):,}")
+        with col2:
+            st.metric("🧩 Células", f"{len(celulas):,}")
+        with col3:
+            aproximadas = celulas['Posições Aproximadas'].sum() / celulas['Matrículas'].sum() * 100
+            st.metric("📐 Posições Aproximadas", f"{aproximadas:.1f}%",
+                      help="Matrículas sem Latitude/Longitude, posicionadas no centro do município ou na capital do estado")
+        
+        centro, zoom = enquadramento(celulas)
+        fig = px.scatter_mapbox(celulas,
+                                lat='Latitude',
+                                lon='Longitude',
+                                size='Matrículas',
+                                color='% Ativos',
+                                hover_name='Local',
+                                hover_data={'Matrículas': True, 'Ativos': True, 'Inativos': True,
+                                            '% Ativos': ':.1f', 'Latitude': False, 'Longitude': False},
+                                color_continuous_scale='RdYlGn',
+                                range_color=(0, 100),
+                                size_max=40,
+                                center=centro,
+                                zoom=zoom,
+                                mapbox_style='carto-positron',
+                                height=600,
+                                title=f"Matrículas por {nivel.split(' ')[0].lower()}")
+        fig.update_layout(margin=dict(l=0, r=0, t=50, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+        
+        if geografia['sem_localizacao'] > 0:
+            st.caption(f"{geografia['sem_localizacao']:,} matrículas sem UF nem coordenadas não aparecem no mapa")
+        if geografia['fora_da_uf'] > 0:
+            st.caption(f"{geografia['fora_da_uf']:,} coordenadas fora do estado informado foram descartadas "
+                       "(posição pelo município ou pela capital)")
+        
+        with st.expander("📋 Ver tabela por local"):
+            st.dataframe(
+                celulas.drop(columns=['Latitude', 'Longitude']),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    '% Ativos': st.column_config.NumberColumn('% Ativos', format='%.1f%%'),
+                }
+            )
+    else:
+        st.info("Não há matrículas com localização para o filtro selecionado")
+    
+    if sem_municipio > 0:
+        st.caption(f"{sem_municipio:,} matrículas sem localização municipal (apenas a UF) não aparecem neste nível; "
+                   "veja-as no nível de estados")
+
+# ============================================
+# PÁGINA 5: DADOS DETALHADOS
 # ============================================
 elif menu == "📊 Dados Detalhados":
     st.header("📊 Visualização Detalhada dos Dados")
     
-    tab1, tab2 = st.tabs(["📋 Dados de Cursos", "📚 Dados de Disciplinas"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📋 Dados de Cursos", "📚 Dados de Disciplinas", "📦 Exportação Completa",
+                                      "💾 Uso de Memória"])
+    
+    # Com uma exportação em andamento a página é executada de novo a cada segundo
+    # (barra de progresso): as tabelas completas não são desenhadas nesse intervalo
+    tarefa = st.session_state.get('exportacao')
+    exportando = tarefa is not None and tarefa.ativa
+    aviso_exportando = ("Exportação em andamento: a tabela volta a ser exibida quando o arquivo ficar pronto "
+                        "(ou cancele na aba Exportação Completa)")
     
     with tab1:
         st.subheader("Dados de Cursos e Alunos")
@@ -778,7 +1229,9 @@ elif menu == "📊 Dados Detalhados":
             default=colunas_default
         )
         
-        if colunas_selecionadas:
+        if exportando:
+            st.info(aviso_exportando)
+        elif colunas_selecionadas:
             # Exibir dataframe
             st.dataframe(
                 df_cursos_filtrado[colunas_selecionadas],
@@ -786,14 +1239,18 @@ elif menu == "📊 Dados Detalhados":
                 height=400
             )
             
-            # Download
-            csv = df_cursos_filtrado[colunas_selecionadas].to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label="⬇️ Download CSV",
-                data=csv,
-                file_name="dados_cursos.csv",
-                mime="text/csv"
-            )
+            # Download: o CSV só é gerado quando pedido, não a cada execução da página
+            if st.button("📥 Preparar CSV", key="preparar_csv_cursos"):
+                st.session_state['csv_pedido'] = 'cursos'
+            if st.session_state.get('csv_pedido') == 'cursos':
+                st.download_button(
+                    label="⬇️ Download CSV",
+                    data=df_cursos_filtrado[colunas_selecionadas].to_csv(index=False, encoding='utf-8-sig'),
+                    file_name="dados_cursos.csv",
+                    mime="text/csv",
+                    on_click=st.session_state.pop,
+                    args=('csv_pedido', None)
+                )
         else:
             st.warning("Selecione pelo menos uma coluna para exibir")
     
@@ -813,7 +1270,9 @@ elif menu == "📊 Dados Detalhados":
             key="disciplinas_cols"
         )
         
-        if colunas_selecionadas:
+        if exportando:
+            st.info(aviso_exportando)
+        elif colunas_selecionadas:
             # Exibir dataframe
             st.dataframe(
                 df_disciplinas_filtrado[colunas_selecionadas],
@@ -821,17 +1280,132 @@ elif menu == "📊 Dados Detalhados":
                 height=400
             )
             
-            # Download
-            csv = df_disciplinas_filtrado[colunas_selecionadas].to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label="⬇️ Download CSV",
-                data=csv,
-                file_name="dados_disciplinas.csv",
-                mime="text/csv",
-                key="download_disciplinas"
-            )
+            # Download: o CSV só é gerado quando pedido, não a cada execução da página
+            if st.button("📥 Preparar CSV", key="preparar_csv_disciplinas"):
+                st.session_state['csv_pedido'] = 'disciplinas'
+            if st.session_state.get('csv_pedido') == 'disciplinas':
+                st.download_button(
+                    label="⬇️ Download CSV",
+                    data=df_disciplinas_filtrado[colunas_selecionadas].to_csv(index=False, encoding='utf-8-sig'),
+                    file_name="dados_disciplinas.csv",
+                    mime="text/csv",
+                    key="download_disciplinas",
+                    on_click=st.session_state.pop,
+                    args=('csv_pedido', None)
+                )
         else:
             st.warning("Selecione pelo menos uma coluna para exibir")
+    
+    with tab3:
+        st.subheader("Exportação Completa")
+        st.caption("Todas as colunas das matrículas e disciplinas do filtro atual. O arquivo é gerado em segundo plano, "
+                   "em lotes: você pode continuar navegando e voltar aqui para baixá-lo.")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            formatos_por_rotulo = {rotulo: formato for formato, (rotulo, _) in FORMATOS.items()}
+            rotulo_formato = st.radio("Formato:", list(formatos_por_rotulo), horizontal=True, key="exportacao_formato",
+                                      help="Excel: uma aba por tabela. Parquet: um arquivo por tabela.")
+            formato_exportacao = formatos_por_rotulo[rotulo_formato]
+        with col2:
+            tabelas_exportacao = st.multiselect("Tabelas:", ["Cursos", "Disciplinas"], default=["Cursos", "Disciplinas"],
+                                                key="exportacao_tabelas")
+        
+        if st.button("📦 Gerar arquivo", disabled=exportando or not tabelas_exportacao, key="exportacao_gerar"):
+            if tarefa is not None:
+                tarefa.descartar()
+            tabelas = {'Cursos': df_cursos_filtrado, 'Disciplinas': df_disciplinas_filtrado}
+            nome_arquivo = 'dados_todos' if id_curso is None else f'dados_curso_{id_curso}'
+            tarefa = TarefaExportacao({nome: tabelas[nome] for nome in tabelas_exportacao},
+                                      formato_exportacao, nome_arquivo).iniciar()
+            st.session_state['exportacao'] = tarefa
+        
+        if tarefa is not None and tarefa.ativa:
+            if st.button("⏹️ Cancelar exportação", key="exportacao_cancelar"):
+                tarefa.cancelar()
+            
+            # Progresso no momento desta execução; o fim da página agenda a próxima
+            # atualização (a exportação continua na thread dela)
+            st.progress(tarefa.progresso, text=f"Exportando... {tarefa.escritas:,} de {tarefa.total:,} linhas")
+        
+        if tarefa is not None:
+            if tarefa.estado == 'concluida':
+                st.success(f"✅ Arquivo pronto: {tarefa.total:,} linhas em {tarefa.duracao:.1f}s")
+                # O arquivo só é lido e enviado ao navegador quando o download é pedido,
+                # não a cada execução da página
+                for indice, (nome_arquivo, caminho) in enumerate(tarefa.arquivos):
+                    if st.button(f"📥 Preparar {nome_arquivo}", key=f"preparar_exportacao_{indice}"):
+                        st.session_state['exportacao_pedida'] = caminho
+                    if st.session_state.get('exportacao_pedida') == caminho:
+                        with open(caminho, 'rb') as arquivo:
+                            st.download_button(
+                                label=f"⬇️ Download {nome_arquivo}",
+                                data=arquivo,
+                                file_name=nome_arquivo,
+                                mime=FORMATOS[tarefa.formato][1],
+                                key=f"download_exportacao_{indice}",
+                                on_click=st.session_state.pop,
+                                args=('exportacao_pedida', None)
+                            )
+            elif tarefa.estado == 'cancelada':
+                st.warning("Exportação cancelada")
+            elif tarefa.estado == 'erro':
+                st.error(f"Erro na exportação: {tarefa.erro}")
+    
+    with tab4:
+        st.subheader("Uso de Memória por Coluna")
+        
+        # Tabelas mantidas em memória pelo processo: completas ou, nas partições, só a do curso
+        if df_cursos is not None:
+            escopo, tabelas_memoria = None, (df_cursos, df_disciplinas)
+        else:
+            escopo, tabelas_memoria = id_curso, (df_cursos_filtrado, df_disciplinas_filtrado)
+        if relatorio_tabelas is None:
+            relatorio_tabelas = memoria_atual(versao_dados, escopo, *tabelas_memoria)
+        relatorio = relatorio_tabelas.copy()
+        
+        if ECONOMIZAR_MEMORIA:
+            st.caption("Redução de memória ativada (ECONOMIZAR_MEMORIA): números no menor tipo sem perda, "
+                       "datas em texto convertidas e textos pouco usados em strings do pyarrow.")
+        else:
+            st.caption("Redução de memória desativada. Ative ECONOMIZAR_MEMORIA em config.py para reduzir "
+                       "os tipos das colunas na carga.")
+        
+        bytes_antes = int(relatorio['Bytes Antes'].sum())
+        bytes_depois = int(relatorio['Bytes Depois'].sum())
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Antes da Redução", f"{bytes_antes / 2**20:,.1f} MB")
+        with col2:
+            reducao = (1 - bytes_depois / bytes_antes) * 100 if bytes_antes > 0 else 0
+            st.metric("Depois da Redução", f"{bytes_depois / 2**20:,.1f} MB", delta=f"-{reducao:.1f}%",
+                      delta_color="inverse")
+        with col3:
+            st.metric("Orçamento", f"{ORCAMENTO_MEMORIA_MB:,} MB" if ORCAMENTO_MEMORIA_MB else "Sem limite")
+        
+        if ORCAMENTO_MEMORIA_MB:
+            if bytes_depois <= ORCAMENTO_MEMORIA_MB * 2**20:
+                st.success(f"✅ As tabelas carregadas cabem no orçamento de {ORCAMENTO_MEMORIA_MB:,} MB")
+            else:
+                st.warning(f"⚠️ As tabelas carregadas ocupam {bytes_depois / 2**20:,.1f} MB, "
+                           f"acima do orçamento de {ORCAMENTO_MEMORIA_MB:,} MB")
+        
+        uso_memo = registro_memos().resumo()
+        st.caption(f"Memo das sessões (tabelas filtradas e agregados por página): {uso_memo['entradas']} entradas "
+                   f"em {uso_memo['sessoes']} sessões, {uso_memo['bytes'] / 2**20:,.1f} MB de "
+                   f"{uso_memo['limite_bytes'] / 2**20:,.0f} MB (LIMITE_MEMO_SESSOES_MB)")
+        
+        relatorio['Redução (%)'] = (1 - relatorio['Bytes Depois'] / relatorio['Bytes Antes'].where(relatorio['Bytes Antes'] > 0)) * 100
+        st.dataframe(
+            relatorio.sort_values('Bytes Antes', ascending=False, kind='stable'),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Bytes Antes': st.column_config.NumberColumn(format="%d"),
+                'Bytes Depois': st.column_config.NumberColumn(format="%d"),
+                'Redução (%)': st.column_config.NumberColumn(format="%.1f%%"),
+            }
+        )
 
 # Footer
 st.markdown("---")
@@ -844,3 +1418,10 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# Exportação em andamento: com a página já desenhada (sem as tabelas completas),
+# espera um pouco e executa de novo para atualizar a barra de progresso
+tarefa_exportacao = st.session_state.get('exportacao')
+if menu == "📊 Dados Detalhados" and tarefa_exportacao is not None and tarefa_exportacao.ativa:
+    time.sleep(INTERVALO_PROGRESSO_EXPORTACAO)
+    st.rerun()
@@ -0,0 +1,223 @@
+# 📐 ESBOÇOS DE QUANTIS
+
+"""
+Esboços mescláveis para medianas, percentis e histogramas sem voltar às linhas.
+
+Cada esboço é um histograma de baldes fixos, então esboços de cursos ou
+disciplinas diferentes se combinam somando as contagens:
+
+- `Percentual Concluído`: dois baldes por ponto percentual, um para o valor
+  inteiro exato e outro para o intervalo aberto até o inteiro seguinte. Assim
+  filtros como "> 0 e < X%" e faixas "(a, b]" com limites inteiros são exatos,
+  e os quantis erram menos de 1 ponto.
+- Dias até a conclusão: um balde por dia até `DIAS_EXATOS` e, acima disso,
+  baldes logarítmicos com erro relativo de `ERRO_RELATIVO_DIAS`.
+
+`construir_esbocos` guarda as contagens (e as somas, para médias exatas) por
+(curso, disciplina, balde) em formato esparso, uma vez por versão dos dados ou
+na gravação das partições. Medianas, percentis e histogramas de qualquer
+seleção de cursos e disciplinas saem da soma dessas entradas.
+"""
+
+import numpy as np
+import pandas as pd
+
+NS_POR_DIA = 86_400 * 10**9
+
+# Percentual: baldes 0..200 (2k = exatamente k; 2k+1 = entre k e k+1)
+BALDES_PERCENTUAL = 201
+
+# Dias: exatos até aqui, logarítmicos depois
+DIAS_EXATOS = 512
+ERRO_RELATIVO_DIAS = 0.01
+GAMA_DIAS = (1 + ERRO_RELATIVO_DIAS) / (1 - ERRO_RELATIVO_DIAS)
+DIAS_MAXIMOS = 36_500
+BALDES_DIAS = DIAS_EXATOS + int(np.ceil(np.log(DIAS_MAXIMOS / DIAS_EXATOS) / np.log(GAMA_DIAS))) + 1
+
+METRICAS = ('percentual', 'dias')
+
+# Limites (em dias) das faixas do histograma de tempo de conclusão; a última é aberta
+LIMITES_FAIXAS_DIAS = (0, 7, 15, 30, 60, 90, 180, 365)
+
+
+# ========================================
+# BALDES
+# ========================================
+
+def baldes_percentual(percentual):
+    """Balde de cada percentual (0 a 100)"""
+    valores = np.clip(np.asarray(percentual, dtype='float64'), 0, 100)
+    inteiro = np.floor(valores)
+    return (2 * inteiro + (valores > inteiro)).astype('int64')
+
+
+def faixa_baldes_percentual():
+    """Menor e maior valor de cada balde de percentual"""
+    balde = np.arange(BALDES_PERCENTUAL)
+    return balde // 2, balde // 2 + balde % 2
+
+
+def baldes_dias(dias):
+    """Balde de cada duração em dias (>= 0)"""
+    dias = np.maximum(np.asarray(dias, dtype='float64'), 0)
+    logaritmico = DIAS_EXATOS + np.floor(np.log(np.maximum(dias, DIAS_EXATOS) / DIAS_EXATOS) / np.log(GAMA_DIAS))
+    balde = np.where(dias < DIAS_EXATOS, np.floor(dias), logaritmico)
+    return np.minimum(balde, BALDES_DIAS - 1).astype('int64')
+
+
+def faixa_baldes_dias():
+    """Valor representativo de cada balde de dias (exato abaixo de DIAS_EXATOS)"""
+    balde = np.arange(BALDES_DIAS, dtype='float64')
+    indice = balde - DIAS_EXATOS
+    representativo = DIAS_EXATOS * GAMA_DIAS ** indice * (1 + GAMA_DIAS) / 2
+    valor = np.where(balde < DIAS_EXATOS, balde, representativo)
+    return valor, valor
+
+
+FAIXAS = {
+    'percentual': (BALDES_PERCENTUAL, faixa_baldes_percentual),
+    'dias': (BALDES_DIAS, faixa_baldes_dias),
+}
+
+
+def intervalo_percentual(minimo, maximo, incluir_maximo=True):
+    """Fatia de baldes com minimo < percentual <= maximo (ou < maximo), para limites inteiros"""
+    return slice(2 * minimo + 1, 2 * maximo + int(incluir_maximo))
+
+
+def faixas_dias(limites=LIMITES_FAIXAS_DIAS):
+    """Rótulo e fatia de baldes de cada faixa de dias (exatas para limites abaixo de DIAS_EXATOS)"""
+    inicio = baldes_dias(limites)
+    fim = list(inicio[1:]) + [BALDES_DIAS]
+    rotulos = [f'{a}-{b - 1}' for a, b in zip(limites[:-1], limites[1:])] + [f'{limites[-1]}+']
+    return [(rotulo, slice(a, b)) for rotulo, a, b in zip(rotulos, inicio, fim)]
+
+
+# ========================================
+# QUANTIS
+# ========================================
+
+def _valor_na_posicao(acumulado, contagem, minimo, maximo, posicao):
+    """
+    Valor do elemento de índice `posicao` (0-based, no vetor global de
+    baldes), supondo os elementos de cada balde espalhados uniformemente.
+    """
+    entrada = np.searchsorted(acumulado, posicao, side='right')
+    dentro = posicao - (acumulado[entrada] - contagem[entrada])
+    return minimo[entrada] + (maximo[entrada] - minimo[entrada]) * (dentro + 0.5) / contagem[entrada]
+
+
+def quantis_agrupados(grupo, contagem, minimo, maximo, quantis):
+    """
+    Quantis (interpolação linear, como `np.quantile`) de cada grupo.
+
+    As entradas devem estar ordenadas por (grupo, balde) e ter contagem > 0.
+    Retorna uma matriz (grupos presentes, quantis) e os grupos.
+    """
+    grupos, inicio, tamanho = np.unique(grupo, return_index=True, return_counts=True)
+    acumulado = np.cumsum(contagem)
+    antes = (acumulado - contagem)[inicio]
+    total = acumulado[inicio + tamanho - 1] - antes
+
+    resultado = np.empty((len(grupos), len(quantis)))
+    for j, q in enumerate(quantis):
+        posicao = q * (total - 1)
+        baixo = np.floor(posicao).astype('int64')
+        alto = np.minimum(baixo + 1, total - 1)
+        v_baixo = _valor_na_posicao(acumulado, contagem, minimo, maximo, antes + baixo)
+        v_alto = _valor_na_posicao(acumulado, contagem, minimo, maximo, antes + alto)
+        resultado[:, j] = v_baixo + (v_alto - v_baixo) * (posicao - baixo)
+    return resultado, grupos
+
+
+def quantis_histograma(histograma, metrica, quantis):
+    """Quantis de um único histograma (NaN se estiver vazio)"""
+    minimo, maximo = FAIXAS[metrica][1]()
+    ocupados = np.flatnonzero(histograma)
+    if len(ocupados) == 0:
+        return np.full(len(quantis), np.nan)
+    resultado, _ = quantis_agrupados(np.zeros(len(ocupados), dtype='int64'), histograma[ocupados],
+                                     np.asarray(minimo, dtype='float64')[ocupados],
+                                     np.asarray(maximo, dtype='float64')[ocupados], quantis)
+    return resultado[0]
+
+
+# ========================================
+# ESBOÇOS POR (CURSO, DISCIPLINA)
+# ========================================
+
+def _esparso(curso, disciplina, balde, valores, n_baldes):
+    """Contagens e somas por (curso, disciplina, balde), ordenadas"""
+    cursos, slot = np.unique(curso, return_inverse=True)
+    n_disciplinas = int(disciplina.max()) + 1 if len(disciplina) else 1
+    chave = (slot * n_disciplinas + disciplina) * n_baldes + balde
+    chaves, posicao, contagem = np.unique(chave, return_inverse=True, return_counts=True)
+    soma = np.bincount(posicao, weights=valores, minlength=len(chaves))
+
+    resto, balde_chave = np.divmod(chaves, n_baldes)
+    slot_chave, disciplina_chave = np.divmod(resto, n_disciplinas)
+    return pd.DataFrame({
+        'idCurso': cursos[slot_chave].astype('int64'),
+        'codDisciplina': disciplina_chave.astype('int32'),
+        'balde': balde_chave.astype('int16'),
+        'contagem': contagem.astype('int64'),
+        'soma': soma,
+    })
+
+
+def construir_esbocos(df_disciplinas):
+    """
+    Esboços de `Percentual Concluído` e dos dias até a conclusão por
+    (curso, disciplina), a partir da tabela fato.
+    """
+    curso = df_disciplinas['idCurso'].to_numpy(dtype='int64')
+    disciplina = df_disciplinas['codDisciplina'].to_numpy(dtype='int64')
+    com_nome = disciplina >= 0
+
+    percentual = df_disciplinas['Percentual Concluído'].to_numpy(dtype='float64')
+    tem_percentual = com_nome & ~np.isnan(percentual)
+
+    inicio = df_disciplinas['Data Início'].to_numpy(dtype='datetime64[ns]')
+    termino = df_disciplinas['Data Término'].to_numpy(dtype='datetime64[ns]')
+    com_datas = com_nome & ~np.isnat(inicio) & ~np.isnat(termino)
+    dias = (termino.view('int64') - inicio.view('int64')) // NS_POR_DIA
+    com_dias = com_datas & (dias >= 0)
+
+    return {
+        'percentual': _esparso(curso[tem_percentual], disciplina[tem_percentual],
+                               baldes_percentual(percentual[tem_percentual]),
+                               percentual[tem_percentual], BALDES_PERCENTUAL),
+        'dias': _esparso(curso[com_dias], disciplina[com_dias], baldes_dias(dias[com_dias]),
+                         dias[com_dias].astype('float64'), BALDES_DIAS),
+    }
+
+
+def recortar_esboco(esboco, id_curso=None):
+    """Entradas de um curso (ou de todos, com `id_curso=None`)"""
+    if id_curso is None:
+        return esboco
+    ids = esboco['idCurso'].to_numpy()
+    return esboco.iloc[np.searchsorted(ids, id_curso, side='left'):np.searchsorted(ids, id_curso, side='right')]
+
+
+def histograma_esboco(esboco, metrica):
+    """Histograma combinado de todas as entradas do esboço"""
+    return np.bincount(esboco['balde'].to_numpy(dtype='int64'), weights=esboco['contagem'].to_numpy(),
+                       minlength=FAIXAS[metrica][0]).astype('int64')
+
+
+def quantis_por_disciplina(esboco, metrica, quantis):
+    """Quantis de cada disciplina, combinando as entradas dos cursos do esboço"""
+    n_baldes, faixa = FAIXAS[metrica]
+    minimo, maximo = (np.asarray(v, dtype='float64') for v in faixa())
+
+    chave = esboco['codDisciplina'].to_numpy(dtype='int64') * n_baldes + esboco['balde'].to_numpy(dtype='int64')
+    chaves, posicao = np.unique(chave, return_inverse=True)
+    contagem = np.bincount(posicao, weights=esboco['contagem'].to_numpy(), minlength=len(chaves)).astype('int64')
+    disciplina, balde = np.divmod(chaves, n_baldes)
+
+    if len(chaves) == 0:
+        return pd.DataFrame(columns=[f'q{int(q * 100)}' for q in quantis])
+    valores, disciplinas = quantis_agrupados(disciplina, contagem, minimo[balde], maximo[balde], quantis)
+    return pd.DataFrame(valores, index=disciplinas, columns=[f'q{int(q * 100)}' for q in quantis])
+
@@ -0,0 +1,235 @@
+# 📦 EXPORTAÇÃO EM SEGUNDO PLANO
+
+"""
+Exportação das tabelas filtradas para XLSX (uma aba por tabela) ou Parquet.
+
+O arquivo é escrito em uma thread própria, em lotes de linhas: o XLSX usa o
+modo `write_only` do openpyxl, que grava cada linha em disco ao ser
+adicionada, e o Parquet usa um `ParquetWriter` que recebe um grupo de linhas
+por lote. Nenhuma cópia completa da tabela é montada em memória e a sessão do
+Streamlit continua respondendo enquanto a exportação anda; o progresso fica na
+própria `TarefaExportacao`.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+# Linhas convertidas e gravadas por vez
+TAMANHO_LOTE_EXPORTACAO = 20_000
+
+# Linhas de dados por aba do Excel (o limite da planilha é 1.048.576, com o cabeçalho)
+LIMITE_LINHAS_XLSX = 1_048_575
+
+# Arquivos gerados (um subdiretório por exportação)
+PASTA_EXPORTACOES = os.path.join(tempfile.gettempdir(), 'dashboard_exportacoes')
+
+# Exportações mais antigas que isso são apagadas ao iniciar uma nova
+HORAS_RETENCAO_EXPORTACOES = 24
+
+# Formato: (rótulo, tipo MIME)
+FORMATOS = {
+    'xlsx': ('Excel (.xlsx)', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet'),
+}
+
+
+# ========================================
+# FUNÇÕES AUXILIARES
+# ========================================
+
+def _lotes(df, tamanho_lote):
+    """Fatias consecutivas de `tamanho_lote` linhas (sem cópia)"""
+    for inicio in range(0, len(df), tamanho_lote):
+        yield df.iloc[inicio:inicio + tamanho_lote]
+
+
+def _linhas_xlsx(lote):
+    """Linhas do lote como tuplas aceitas pelo openpyxl (ausentes viram células vazias)"""
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    valores = lote.astype(object).where(lote.notna(), None)
+    for col in lote.select_dtypes(include=['object', 'string']).columns:
+        # Caracteres de controle vindos da exportação não são aceitos no XML da planilha
+        valores[col] = [ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v for v in valores[col]]
+    return valores.itertuples(index=False, name=None)
+
+
+def _nome_aba(nome, parte):
+    """Nome de aba válido no Excel (máximo 31 caracteres, numerado se a tabela for dividida)"""
+    nome = ''.join(c for c in nome if c not in '[]:*?/\\')
+    sufixo = f" ({parte})" if parte > 1 else ''
+    return nome[:31 - len(sufixo)] + sufixo
+
+
+def _esquema_parquet(df):
+    """Esquema Arrow da tabela inteira (colunas de texto sempre como string)"""
+    import pyarrow as pa
+
+    base = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    campos = [pa.field(campo.name, pa.string()) if df[campo.name].dtype == object else campo
+              for campo in base]
+    return pa.schema(campos, metadata=base.metadata)
+
+
+def _texto_parquet(lote):
+    """Converte colunas de texto com valores não textuais (ex.: números da planilha) para string"""
+    lote = lote.copy()
+    for col in lote.columns[lote.dtypes == object]:
+        lote[col] = lote[col].where(lote[col].isna(), lote[col].astype(str))
+    return lote
+
+
+# ========================================
+# ESCRITA EM LOTES
+# ========================================
+
+def escrever_xlsx(tabelas, caminho, ao_avancar=None, tamanho_lote=TAMANHO_LOTE_EXPORTACAO):
+    """Grava cada tabela em uma aba (dividida em várias se passar do limite de linhas do Excel)"""
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    try:
+        for nome, df in tabelas.items():
+            cabecalho = [str(col) for col in df.columns]
+            parte = 1
+            aba = livro.create_sheet(_nome_aba(nome, parte))
+            aba.append(cabecalho)
+            linhas_aba = 0
+
+            for lote in _lotes(df, tamanho_lote):
+                for linha in _linhas_xlsx(lote):
+                    if linhas_aba == LIMITE_LINHAS_XLSX:
+                        parte += 1
+                        aba = livro.create_sheet(_nome_aba(nome, parte))
+                        aba.append(cabecalho)
+                        linhas_aba = 0
+                    aba.append(linha)
+                    linhas_aba += 1
+                if ao_avancar:
+                    ao_avancar(len(lote))
+    except BaseException:
+        # Fecha os arquivos temporários das abas antes de abandonar a planilha
+        for aba in livro.worksheets:
+            aba.close()
+        raise
+
+    livro.save(caminho)
+
+
+def escrever_parquet(df, caminho, ao_avancar=None, tamanho_lote=TAMANHO_LOTE_EXPORTACAO):
+    """Grava a tabela em Parquet, um grupo de linhas por lote"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = _esquema_parquet(df)
+    with pq.ParquetWriter(caminho, esquema) as escritor:
+        for lote in _lotes(df, tamanho_lote):
+            escritor.write_table(pa.Table.from_pandas(_texto_parquet(lote), schema=esquema, preserve_index=False))
+            if ao_avancar:
+                ao_avancar(len(lote))
+
+
+def limpar_exportacoes_antigas(pasta=PASTA_EXPORTACOES, horas=HORAS_RETENCAO_EXPORTACOES):
+    """Apaga exportações geradas há mais de `horas` horas"""
+    if not os.path.isdir(pasta):
+        return
+    limite = time.time() - horas * 3600
+    for item in os.scandir(pasta):
+        if item.is_dir() and item.stat().st_mtime < limite:
+            shutil.rmtree(item.path, ignore_errors=True)
+
+
+# ========================================
+# TAREFA
+# ========================================
+
+class TarefaExportacao:
+    """Exportação de uma ou mais tabelas em uma thread, com progresso por linhas gravadas"""
+
+    def __init__(self, tabelas, formato, nome, pasta=PASTA_EXPORTACOES, tamanho_lote=TAMANHO_LOTE_EXPORTACAO):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de exportação desconhecido: {formato}")
+        self.tabelas = tabelas
+        self.formato = formato
+        self.nome = nome
+        self.total = sum(len(df) for df in tabelas.values())
+        self.escritas = 0
+        self.estado = 'aguardando'
+        self.erro = None
+        self.duracao = None
+        # [(nome do arquivo para download, caminho em disco)], preenchido ao concluir
+        self.arquivos = []
+        self._pasta = os.path.join(pasta, uuid.uuid4().hex)
+        self._tamanho_lote = tamanho_lote
+        self._trava = threading.Lock()
+        self._cancelar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name=f"exportacao-{nome}", daemon=True)
+
+    @property
+    def ativa(self):
+        """True enquanto a thread estiver gravando"""
+        return self._thread.is_alive()
+
+    @property
+    def progresso(self):
+        """Fração das linhas já gravadas (0 a 1)"""
+        return min(self.escritas / self.total, 1.0) if self.total else 1.0
+
+    def iniciar(self):
+        """Dispara a exportação em segundo plano"""
+        limpar_exportacoes_antigas(os.path.dirname(self._pasta))
+        self._thread.start()
+        return self
+
+    def cancelar(self):
+        """Interrompe a exportação no próximo lote"""
+        self._cancelar.set()
+
+    def descartar(self):
+        """Cancela (se ainda estiver ativa) e apaga os arquivos gerados"""
+        self.cancelar()
+        if self.ativa:
+            self._thread.join()
+        shutil.rmtree(self._pasta, ignore_errors=True)
+
+    def _avancar(self, linhas):
+        """Registra um lote gravado e verifica se houve cancelamento"""
+        with self._trava:
+            self.escritas += linhas
+        if self._cancelar.is_set():
+            raise InterruptedError("Exportação cancelada")
+
+    def _executar(self):
+        """Corpo da thread: grava os arquivos e registra o resultado"""
+        inicio = time.perf_counter()
+        self.estado = 'executando'
+        try:
+            os.makedirs(self._pasta, exist_ok=True)
+            if self.formato == 'xlsx':
+                caminho = os.path.join(self._pasta, f"{self.nome}.xlsx")
+                escrever_xlsx(self.tabelas, caminho, self._avancar, self._tamanho_lote)
+                arquivos = [(os.path.basename(caminho), caminho)]
+            else:
+                arquivos = []
+                for nome_tabela, df in self.tabelas.items():
+                    arquivo = f"{self.nome}_{nome_tabela.lower()}.parquet"
+                    caminho = os.path.join(self._pasta, arquivo)
+                    escrever_parquet(df, caminho, self._avancar, self._tamanho_lote)
+                    arquivos.append((arquivo, caminho))
+            self.arquivos = arquivos
+            self.estado = 'concluida'
+        except InterruptedError:
+            self.estado = 'cancelada'
+            shutil.rmtree(self._pasta, ignore_errors=True)
+        except Exception as e:
+            self.estado = 'erro'
+            self.erro = str(e)
+            shutil.rmtree(self._pasta, ignore_errors=True)
+        finally:
+            # A tarefa não precisa mais segurar as tabelas
+            self.tabelas = {}
+            self.duracao = time.perf_counter() - inicio
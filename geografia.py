@@ -0,0 +1,243 @@
+# 🗺️ AGREGAÇÃO GEOGRÁFICA
+
+"""
+Agrupa as matrículas em células geográficas para o mapa de alunos.
+
+`preparar_geografia` monta, uma vez por curso e versão dos dados, arrays com a
+posição de cada matrícula. Coordenadas fora dos limites da própria UF são
+descartadas. Quem não tem `Latitude`/`Longitude` válidas recebe o centro das
+coordenadas conhecidas do mesmo município (`Cidade1` + `UF`) ou, na falta
+delas, a posição da capital do estado. `agregar_celulas` reduz esses arrays
+por estado, município ou grade regular (latitude/longitude) com `np.unique` +
+`np.bincount`: o mapa recebe uma linha por célula, nunca uma por aluno.
+Posições só da capital valem apenas no nível de estado; nos níveis de
+município e grade essas matrículas ficam fora do mapa e são contadas à parte.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Níveis de detalhe do mapa: (tipo de agrupamento, lado da célula em graus)
+NIVEIS = {
+    'Estados (UF)': ('uf', None),
+    'Municípios': ('cidade', None),
+    'Grade ~100 km': ('grade', 1.0),
+    'Grade ~25 km': ('grade', 0.25),
+    'Grade ~5 km': ('grade', 0.05),
+}
+
+# Faixa aceita para coordenadas no Brasil (fora dela a coordenada é descartada)
+LIMITES_LATITUDE = (-34.0, 6.0)
+LIMITES_LONGITUDE = (-75.0, -28.0)
+
+# Posição aproximada de cada estado (capital), para quem só tem a UF
+CAPITAIS_UF = {
+    'AC': (-9.97, -67.81), 'AL': (-9.67, -35.74), 'AM': (-3.12, -60.02), 'AP': (0.03, -51.07),
+    'BA': (-12.97, -38.50), 'CE': (-3.73, -38.52), 'DF': (-15.79, -47.88), 'ES': (-20.32, -40.34),
+    'GO': (-16.69, -49.26), 'MA': (-2.53, -44.30), 'MG': (-19.92, -43.94), 'MS': (-20.44, -54.65),
+    'MT': (-15.60, -56.10), 'PA': (-1.46, -48.50), 'PB': (-7.12, -34.86), 'PE': (-8.05, -34.88),
+    'PI': (-5.09, -42.80), 'PR': (-25.43, -49.27), 'RJ': (-22.91, -43.17), 'RN': (-5.79, -35.21),
+    'RO': (-8.76, -63.90), 'RR': (2.82, -60.67), 'RS': (-30.03, -51.23), 'SC': (-27.60, -48.55),
+    'SE': (-10.91, -37.07), 'SP': (-23.55, -46.63), 'TO': (-10.18, -48.33),
+}
+
+# Retângulo aproximado de cada estado (lat. mín., lat. máx., lon. mín., lon. máx.), sem ilhas oceânicas
+LIMITES_UF = {
+    'AC': (-11.2, -7.1, -74.0, -66.6), 'AL': (-10.5, -8.8, -38.3, -35.1), 'AM': (-9.9, 2.3, -73.8, -56.1),
+    'AP': (-1.3, 4.5, -54.9, -49.8), 'BA': (-18.4, -8.5, -46.7, -37.3), 'CE': (-7.9, -2.7, -41.5, -37.2),
+    'DF': (-16.1, -15.5, -48.3, -47.3), 'ES': (-21.3, -17.9, -41.9, -39.6), 'GO': (-19.5, -12.4, -53.3, -45.9),
+    'MA': (-10.3, -1.0, -48.8, -41.8), 'MG': (-23.0, -14.2, -51.1, -39.8), 'MS': (-24.1, -17.1, -58.2, -50.9),
+    'MT': (-18.1, -7.3, -61.7, -50.2), 'PA': (-9.9, 2.6, -58.9, -46.0), 'PB': (-8.3, -6.0, -38.8, -34.8),
+    'PE': (-9.5, -7.3, -41.4, -34.8), 'PI': (-11.0, -2.7, -46.0, -40.3), 'PR': (-26.8, -22.5, -54.7, -48.0),
+    'RJ': (-23.4, -20.7, -44.9, -40.9), 'RN': (-7.0, -4.8, -38.6, -34.9), 'RO': (-13.7, -7.9, -66.9, -59.7),
+    'RR': (-1.6, 5.3, -64.9, -58.8), 'RS': (-33.8, -27.0, -57.7, -49.7), 'SC': (-29.4, -25.9, -53.9, -48.3),
+    'SE': (-11.6, -9.5, -38.3, -36.4), 'SP': (-25.4, -19.7, -53.2, -44.1), 'TO': (-13.5, -5.1, -50.8, -45.7),
+}
+# Folga (em graus) ao comparar uma coordenada com o retângulo da UF
+FOLGA_LIMITES_UF = 0.5
+
+# Origem da posição de cada matrícula
+PRECISAO_COORDENADA = 0
+PRECISAO_MUNICIPIO = 1
+PRECISAO_UF = 2
+
+
+# ========================================
+# FUNÇÕES AUXILIARES
+# ========================================
+
+def _texto(df, coluna):
+    """Coluna de texto sem espaços nas pontas (ausente se a coluna não existir)"""
+    if coluna not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    serie = df[coluna].astype(object).where(df[coluna].notna())
+    serie = serie.str.strip()
+    return serie.mask(serie == '')
+
+
+def _coordenada(df, coluna, limites):
+    """Coordenada numérica; valores fora da faixa do Brasil viram NaN"""
+    if coluna not in df.columns:
+        return np.full(len(df), np.nan)
+    valores = pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype='float64')
+    return np.where((valores >= limites[0]) & (valores <= limites[1]), valores, np.nan)
+
+
+def _media_por_grupo(codigos, valores, n_grupos):
+    """Média de `valores` por código (NaN para grupos sem valores conhecidos)"""
+    conhecidos = (codigos >= 0) & ~np.isnan(valores)
+    soma = np.bincount(codigos[conhecidos], weights=valores[conhecidos], minlength=n_grupos)
+    quantidade = np.bincount(codigos[conhecidos], minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return soma / quantidade
+
+
+# ========================================
+# PREPARAÇÃO (UMA VEZ POR CURSO E VERSÃO)
+# ========================================
+
+def preparar_geografia(df_cursos):
+    """
+    Posição, estado, município e status de cada matrícula com localização.
+
+    Retorna arrays alinhados (só matrículas com posição conhecida ou estimada),
+    os nomes de UFs/municípios indexados pelos códigos, quantas matrículas
+    ficaram sem nenhuma localização e quantas coordenadas foram descartadas
+    por cair fora da UF.
+    """
+    uf = _texto(df_cursos, 'UF').str.upper()
+    cidade = _texto(df_cursos, 'Cidade1')
+
+    codigo_uf, nomes_uf = pd.factorize(uf, sort=True)
+    codigo_cidade, nomes_cidade = pd.factorize(cidade + '/' + uf, sort=True)
+
+    latitude = _coordenada(df_cursos, 'Latitude', LIMITES_LATITUDE)
+    longitude = _coordenada(df_cursos, 'Longitude', LIMITES_LONGITUDE)
+    precisao = np.full(len(df_cursos), PRECISAO_COORDENADA, dtype='int8')
+
+    # Coordenadas fora do retângulo da própria UF (ex.: trocadas com as de outro estado) são descartadas
+    limites = np.array([LIMITES_UF.get(sigla, (-90.0, 90.0, -180.0, 180.0)) for sigla in nomes_uf],
+                       dtype='float64').reshape(-1, 4)
+    com_uf = codigo_uf >= 0
+    caixa = limites[codigo_uf[com_uf]]
+    fora_da_uf = np.zeros(len(df_cursos), dtype=bool)
+    fora_da_uf[com_uf] = ((latitude[com_uf] < caixa[:, 0] - FOLGA_LIMITES_UF)
+                          | (latitude[com_uf] > caixa[:, 1] + FOLGA_LIMITES_UF)
+                          | (longitude[com_uf] < caixa[:, 2] - FOLGA_LIMITES_UF)
+                          | (longitude[com_uf] > caixa[:, 3] + FOLGA_LIMITES_UF))
+
+    # Sem coordenada válida: centro das coordenadas conhecidas do município
+    sem_posicao = np.isnan(latitude) | np.isnan(longitude) | fora_da_uf
+    latitude[sem_posicao] = np.nan
+    longitude[sem_posicao] = np.nan
+    lat_cidade = _media_por_grupo(codigo_cidade, latitude, len(nomes_cidade))
+    lon_cidade = _media_por_grupo(codigo_cidade, longitude, len(nomes_cidade))
+    pela_cidade = sem_posicao & (codigo_cidade >= 0)
+    latitude[pela_cidade] = lat_cidade[codigo_cidade[pela_cidade]]
+    longitude[pela_cidade] = lon_cidade[codigo_cidade[pela_cidade]]
+    precisao[pela_cidade] = PRECISAO_MUNICIPIO
+
+    # Ainda sem posição: capital do estado
+    capitais = np.array([CAPITAIS_UF.get(sigla, (np.nan, np.nan)) for sigla in nomes_uf],
+                        dtype='float64').reshape(-1, 2)
+    pela_uf = np.isnan(latitude) & (codigo_uf >= 0)
+    latitude[pela_uf] = capitais[codigo_uf[pela_uf], 0]
+    longitude[pela_uf] = capitais[codigo_uf[pela_uf], 1]
+    precisao[pela_uf] = PRECISAO_UF
+
+    localizadas = ~np.isnan(latitude)
+    return {
+        'latitude': latitude[localizadas],
+        'longitude': longitude[localizadas],
+        'precisao': precisao[localizadas],
+        'uf': codigo_uf[localizadas],
+        'cidade': codigo_cidade[localizadas],
+        'ativo': (df_cursos['Aluno Ativo'] == 'Sim').to_numpy()[localizadas],
+        'nomes_uf': np.asarray(nomes_uf, dtype=object),
+        'nomes_cidade': np.asarray(nomes_cidade, dtype=object),
+        'sem_localizacao': int((~localizadas).sum()),
+        'fora_da_uf': int(fora_da_uf.sum()),
+    }
+
+
+# ========================================
+# AGREGAÇÃO POR CÉLULA
+# ========================================
+
+def agregar_celulas(geografia, nivel, ativo=None, uf=None):
+    """
+    Matrículas por célula do nível de detalhe escolhido.
+
+    `ativo` (True/False/None) filtra pelo status do aluno e `uf` restringe a
+    um estado (drill-down). Cada linha traz o centro das matrículas da célula,
+    usado como posição no mapa. Retorna a tabela e quantas matrículas da
+    seleção ficaram fora dela por só terem a posição da capital (níveis de
+    município e grade).
+    """
+    selecao = np.ones(len(geografia['latitude']), dtype=bool)
+    if ativo is not None:
+        selecao &= geografia['ativo'] == ativo
+    if uf is not None:
+        codigo = np.flatnonzero(geografia['nomes_uf'] == uf)
+        selecao &= geografia['uf'] == (codigo[0] if len(codigo) else -2)
+
+    tipo, tamanho = NIVEIS[nivel]
+    sem_municipio = 0
+    if tipo != 'uf':
+        # A capital da UF não diz nada sobre o município: essas matrículas se empilhariam nela
+        apenas_uf = selecao & (geografia['precisao'] == PRECISAO_UF)
+        sem_municipio = int(apenas_uf.sum())
+        selecao &= ~apenas_uf
+    latitude = geografia['latitude'][selecao]
+    longitude = geografia['longitude'][selecao]
+    if tipo == 'grade':
+        linha = np.floor((latitude + 90) / tamanho).astype('int64')
+        coluna = np.floor((longitude + 180) / tamanho).astype('int64')
+        chave = linha * int(np.ceil(360 / tamanho)) + coluna
+    else:
+        chave = geografia[tipo][selecao]
+
+    validas = chave >= 0
+    chave, latitude, longitude = chave[validas], latitude[validas], longitude[validas]
+    ativos = geografia['ativo'][selecao][validas]
+    aproximadas = geografia['precisao'][selecao][validas] != PRECISAO_COORDENADA
+
+    celulas, celula = np.unique(chave, return_inverse=True)
+    if len(celulas) == 0:
+        return pd.DataFrame(columns=['Local', 'Latitude', 'Longitude', 'Matrículas', 'Ativos', 'Inativos',
+                                     '% Ativos', 'Posições Aproximadas']), sem_municipio
+
+    matriculas = np.bincount(celula, minlength=len(celulas))
+    centro_lat = np.bincount(celula, weights=latitude) / matriculas
+    centro_lon = np.bincount(celula, weights=longitude) / matriculas
+    if tipo == 'uf':
+        local = geografia['nomes_uf'][celulas]
+    elif tipo == 'cidade':
+        local = geografia['nomes_cidade'][celulas]
+    else:
+        local = np.char.add(np.char.add(np.round(centro_lat, 2).astype(str), ', '),
+                            np.round(centro_lon, 2).astype(str))
+
+    n_ativos = np.bincount(celula, weights=ativos, minlength=len(celulas)).astype('int64')
+    tabela = pd.DataFrame({
+        'Local': local,
+        'Latitude': centro_lat,
+        'Longitude': centro_lon,
+        'Matrículas': matriculas,
+        'Ativos': n_ativos,
+        'Inativos': matriculas - n_ativos,
+        '% Ativos': n_ativos / matriculas * 100,
+        'Posições Aproximadas': np.bincount(celula, weights=aproximadas, minlength=len(celulas)).astype('int64'),
+    })
+    return tabela.sort_values('Matrículas', ascending=False, kind='stable').reset_index(drop=True), sem_municipio
+
+
+def enquadramento(celulas):
+    """Centro e zoom do mapa que enquadram as células (ignorando 5% de posições isoladas em cada ponta)"""
+    if len(celulas) == 0:
+        return {'lat': -14.2, 'lon': -51.9}, 3
+    lat_min, lat_max = celulas['Latitude'].quantile([0.05, 0.95])
+    lon_min, lon_max = celulas['Longitude'].quantile([0.05, 0.95])
+    extensao = max(lat_max - lat_min, lon_max - lon_min, 0.05)
+    zoom = float(np.clip(np.log2(360 / extensao) - 1, 3, 11))
+    return {'lat': float((lat_max + lat_min) / 2), 'lon': float((lon_max + lon_min) / 2)}, zoom
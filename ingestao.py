@@ -0,0 +1,286 @@
+# 📥 INGESTÃO E LIMPEZA DOS DADOS
+
+"""
+Leitura e normalização dos arquivos exportados pela plataforma.
+
+A exportação bruta traz campos com espaços à direita, IDs prefixados com
+apóstrofo, colunas duplicadas e uma coluna vazia no final (causada pelo `;`
+que encerra cada linha). A limpeza é feita uma única vez na carga, para que
+filtros e junções trabalhem com chaves inteiras.
+"""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+# ========================================
+# ARQUIVOS DE ORIGEM
+# ========================================
+
+ARQUIVO_CURSOS = 'Cursos.csv'
+ARQUIVO_DISCIPLINAS = 'Disciplinas.xlsx'
+
+FORMATO_DATA = '%d/%m/%Y %H:%M:%S'
+
+# Colunas com códigos que só precisam de espaços removidos (não são numéricas)
+COLUNAS_CODIGO = ['Matrícula', 'Número', 'Complemento', 'CEP', 'Login']
+
+# Colunas redundantes na exportação de cursos: (coluna mantida, coluna descartada)
+COLUNAS_DUPLICADAS = [('Situação', 'Situação1')]
+
+# Valor das colunas de ID com o campo vazio na exportação (mesma convenção de
+# `idMatricula`/`idCurso` = -1 para linhas sem vínculo na tabela fato)
+SEM_ID = -1
+
+# Exemplos de valores inválidos exibidos no aviso
+EXEMPLOS_INVALIDOS = 5
+
+log = logging.getLogger('ingestao')
+
+
+# ========================================
+# FUNÇÕES AUXILIARES
+# ========================================
+
+def _remover_colunas_vazias(df):
+    """Remove colunas 'Unnamed' totalmente vazias (geradas pelo `;` final)"""
+    vazias = [col for col in df.columns
+              if str(col).startswith('Unnamed') and df[col].isna().all()]
+    return df.drop(columns=vazias)
+
+
+def _limpar_codigo(serie):
+    """Remove espaços e apóstrofos de um campo de código, mantendo texto"""
+    if serie.dtype != object:
+        return serie
+    serie = serie.str.strip().str.lstrip("'")
+    return serie.mask(serie == '')
+
+
+def _para_inteiro(serie, avisos=None):
+    """
+    Converte um campo de ID para int64; campos vazios viram `SEM_ID`.
+
+    Valores que não são inteiros não negativos (ex.: '3.7', 'abc') também viram
+    `SEM_ID`, em vez de serem truncados: só a linha perde o vínculo, e um aviso
+    com exemplos vai para o log e para a lista `avisos`.
+    """
+    if pd.api.types.is_integer_dtype(serie) and not serie.isna().any():
+        numeros = serie
+        presentes = np.ones(len(serie), dtype=bool)
+    else:
+        if pd.api.types.is_numeric_dtype(serie):
+            texto = serie
+        else:
+            # Números lidos como objeto também passam por texto antes da limpeza
+            texto = _limpar_codigo(serie.astype(object).where(serie.isna(), serie.astype(str)))
+        presentes = texto.notna().to_numpy()
+        numeros = pd.to_numeric(texto, errors='coerce')
+
+    valores = numeros.to_numpy(dtype='float64', na_value=np.nan)
+    validos = np.isfinite(valores) & (valores == np.round(valores)) & (valores >= 0)
+    invalidos = presentes & ~validos
+    if invalidos.any():
+        exemplos = serie[invalidos].astype(str).unique()[:EXEMPLOS_INVALIDOS]
+        aviso = (f"Coluna '{serie.name}': {int(invalidos.sum()):,} IDs que não são inteiros não negativos "
+                 f"foram tratados como vazios (ex.: {', '.join(exemplos)})")
+        log.warning(aviso)
+        if avisos is not None:
+            avisos.append(aviso)
+    return numeros.where(presentes & validos, SEM_ID).astype('int64')
+
+
+def _para_data(serie, formato=FORMATO_DATA):
+    """Converte datas no formato da exportação"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    return pd.to_datetime(serie, format=formato, errors='coerce')
+
+
+def _status_ativo(serie):
+    """Converte status de aluno ativo (1 = Sim, 0 = Não)"""
+    return pd.Series(np.where(serie == 1, 'Sim', 'Não'), index=serie.index)
+
+
+def _normalizar_ids(df, avisos=None):
+    """Converte todas as colunas de ID (prefixo 'id') para int64 (`SEM_ID` nos campos vazios ou inválidos)"""
+    for col in df.columns:
+        if str(col).startswith('id'):
+            df[col] = _para_inteiro(df[col], avisos)
+    return df
+
+
+# ========================================
+# LIMPEZA
+# ========================================
+
+def limpar_cursos(df_cursos, avisos=None):
+    """Normaliza a exportação de cursos/matrículas (IDs inválidos são relatados em `avisos`)"""
+    df = _remover_colunas_vazias(df_cursos)
+
+    # Usar Curso1 (nome completo) em vez de Curso (código, igual a idCurso)
+    if 'Curso1' in df.columns:
+        df['Curso'] = df['Curso1']
+        df = df.drop(columns=['Curso1'])
+
+    for mantida, descartada in COLUNAS_DUPLICADAS:
+        if descartada in df.columns:
+            if mantida in df.columns:
+                df[mantida] = df[mantida].combine_first(df[descartada])
+            else:
+                df[mantida] = df[descartada]
+            df = df.drop(columns=[descartada])
+
+    df = _normalizar_ids(df, avisos)
+    # Matrículas sem aluno ou sem curso não identificam nenhuma matrícula
+    df = df[(df['idAluno'] != SEM_ID) & (df['idCurso'] != SEM_ID)].reset_index(drop=True)
+    for col in COLUNAS_CODIGO:
+        if col in df.columns:
+            df[col] = _limpar_codigo(df[col])
+
+    df['Aluno Ativo'] = _status_ativo(df['Aluno Ativo'])
+
+    for col in ['Data Matrícula', 'Primeiro Acesso', 'Último Acesso']:
+        df[col] = _para_data(df[col])
+
+    return df
+
+
+def limpar_disciplinas(df_disciplinas, avisos=None):
+    """Normaliza a exportação de disciplinas (IDs inválidos são relatados em `avisos`)"""
+    df = _remover_colunas_vazias(df_disciplinas)
+
+    df = _normalizar_ids(df, avisos)
+    for col in COLUNAS_CODIGO:
+        if col in df.columns:
+            df[col] = _limpar_codigo(df[col])
+
+    df['Aluno Ativo'] = _status_ativo(df['Aluno Ativo'])
+
+    for col in ['Data Matrícula', 'Primeiro Acesso', 'Último Acesso']:
+        df[col] = _para_data(df[col])
+    for col in ['Data Início', 'Data Término', 'Liberado a Partir De']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    return df
+
+
+# ========================================
+# TABELA FATO DE MATRÍCULAS
+# ========================================
+
+def _vincular(chaves_disc, chaves_mat, colunas):
+    """Retorna o idMatricula de cada linha de disciplina pelas colunas dadas (-1 se ambíguo/ausente)"""
+    unicas = chaves_mat.drop_duplicates(subset=colunas, keep=False)
+    vinculo = chaves_disc[colunas].merge(unicas[colunas + ['idMatricula']], on=colunas, how='left')
+    return vinculo['idMatricula'].fillna(-1).to_numpy(dtype='int64')
+
+
+def construir_fato_matriculas(df_cursos, df_disciplinas):
+    """
+    Vincula cada linha de disciplina à sua matrícula (idAluno, idCurso).
+
+    Cada matrícula recebe uma chave substituta inteira (`idMatricula`) e ambas as
+    tabelas são ordenadas por `idCurso`, de modo que o recorte de um curso seja
+    uma fatia contígua (ver `fatiar_curso`). O vínculo usa, nesta ordem:
+    `idCurso` (se a exportação de disciplinas o trouxer), a `Data Matrícula` do
+    aluno, a única matrícula do aluno e, por fim, o curso do aluno que oferece a
+    disciplina. Linhas sem vínculo (inclusive as sem `idAluno`, que chegam com
+    `SEM_ID`) recebem `idMatricula = idCurso = -1` e só aparecem na visão "Todos".
+    """
+    df_cursos = df_cursos.sort_values(['idCurso', 'idAluno'], kind='stable').reset_index(drop=True)
+    df_cursos['idMatricula'] = np.arange(len(df_cursos), dtype='int64')
+
+    chaves_mat = df_cursos[['idMatricula', 'idAluno', 'idCurso', 'Data Matrícula']]
+    id_matricula = np.full(len(df_disciplinas), -1, dtype='int64')
+
+    tentativas = [['idAluno', 'idCurso'], ['idAluno', 'Data Matrícula'], ['idAluno']]
+    for colunas in tentativas:
+        if not all(col in df_disciplinas.columns for col in colunas):
+            continue
+        pendentes = id_matricula == -1
+        if not pendentes.any():
+            break
+        id_matricula[pendentes] = _vincular(df_disciplinas.loc[pendentes], chaves_mat, colunas)
+
+    # Alunos com mais de uma matrícula: usar o curso que oferece a disciplina
+    pendentes = id_matricula == -1
+    if pendentes.any() and 'Disciplina' in df_disciplinas.columns:
+        vinculadas = pd.DataFrame({
+            'Disciplina': df_disciplinas['Disciplina'].to_numpy()[~pendentes],
+            'idCurso': df_cursos['idCurso'].to_numpy()[id_matricula[~pendentes]],
+        }).drop_duplicates()
+        candidatas = (df_disciplinas.loc[pendentes, ['idAluno', 'Disciplina']]
+                      .reset_index(drop=True)
+                      .reset_index()
+                      .merge(chaves_mat[['idMatricula', 'idAluno', 'idCurso']], on='idAluno')
+                      .merge(vinculadas, on=['Disciplina', 'idCurso']))
+        candidatas = candidatas.drop_duplicates(subset='index', keep=False)
+        resolvidas = np.full(pendentes.sum(), -1, dtype='int64')
+        resolvidas[candidatas['index'].to_numpy()] = candidatas['idMatricula'].to_numpy()
+        id_matricula[pendentes] = resolvidas
+
+    fato = df_disciplinas.copy()
+    fato['idMatricula'] = id_matricula
+    fato['idCurso'] = np.where(id_matricula >= 0,
+                               df_cursos['idCurso'].to_numpy()[id_matricula],
+                               -1)
+    fato = fato.sort_values(['idCurso', 'idMatricula'], kind='stable').reset_index(drop=True)
+
+    # Código inteiro da disciplina (ordem alfabética; -1 = sem nome)
+    if 'Disciplina' in fato.columns:
+        fato['codDisciplina'] = pd.factorize(fato['Disciplina'], sort=True)[0].astype('int32')
+
+    return df_cursos, fato
+
+
+def fatiar_curso(df, id_curso, coluna='idCurso'):
+    """Recorta as linhas de um curso em uma tabela ordenada por `coluna` (busca binária, sem cópia)"""
+    ids = df[coluna].to_numpy()
+    inicio = np.searchsorted(ids, id_curso, side='left')
+    fim = np.searchsorted(ids, id_curso, side='right')
+    return df.iloc[inicio:fim]
+
+
+# ========================================
+# CARGA
+# ========================================
+
+def versao_snapshot(caminhos=(ARQUIVO_CURSOS, ARQUIVO_DISCIPLINAS)):
+    """Identifica a versão dos arquivos de origem (data de modificação e tamanho)"""
+    partes = []
+    for caminho in caminhos:
+        try:
+            info = os.stat(caminho)
+            partes.append(f"{info.st_mtime_ns}-{info.st_size}")
+        except OSError:
+            partes.append('ausente')
+    return '_'.join(partes)
+
+
+def ler_cursos(caminho=ARQUIVO_CURSOS, avisos=None):
+    """Lê e limpa o arquivo de cursos"""
+    df = pd.read_csv(caminho,
+                     encoding='ISO-8859-1',
+                     sep=';',
+                     dtype={'idLogin': str, 'Login': str, 'Número': str, 'CEP': str},
+                     low_memory=False)
+    return limpar_cursos(df, avisos)
+
+
+def ler_disciplinas(caminho=ARQUIVO_DISCIPLINAS, avisos=None):
+    """Lê e limpa o arquivo de disciplinas"""
+    return limpar_disciplinas(pd.read_excel(caminho), avisos)
+
+
+def carregar_dados(caminho_cursos=ARQUIVO_CURSOS, caminho_disciplinas=ARQUIVO_DISCIPLINAS, avisos=None):
+    """
+    Carrega e normaliza os dois arquivos de origem, já vinculados por matrícula.
+
+    Problemas que não impedem a carga (ex.: IDs inválidos) são acrescentados a `avisos`.
+    """
+    return construir_fato_matriculas(ler_cursos(caminho_cursos, avisos),
+                                     ler_disciplinas(caminho_disciplinas, avisos))
@@ -0,0 +1,196 @@
+# 🧠 MEMO DAS VISÕES POR SESSÃO
+
+"""
+Memo, por sessão, dos recortes das tabelas e dos insumos derivados das páginas.
+
+As tabelas completas ficam em `st.cache_resource` (um objeto por processo,
+compartilhado entre as sessões) e não passam pelo memo. O que depende da
+sessão, como o recorte do curso e os agregados da página, sai de
+`st.cache_data` como uma cópia nova (desserializada) a cada chamada; sem o
+memo, cada troca de página refaria essas cópias antes de desenhar qualquer
+coisa. Cada sessão guarda um `MemoSessao` em `st.session_state`, com entradas
+indexadas por (versão do snapshot, filtro de curso, item): navegar entre as
+páginas com o mesmo curso reaproveita os objetos já montados.
+
+O `RegistroMemos` é único no processo e soma o tamanho estimado das entradas
+de todas as sessões. Passando do limite, descarta as entradas usadas há mais
+tempo, de qualquer sessão (a sessão afetada apenas recalcula o item na
+próxima execução). Sessões encerradas saem do registro sozinhas: ele só guarda
+referências fracas aos memos.
+"""
+
+import itertools
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Linhas amostradas para estimar o tamanho de colunas de texto (object)
+AMOSTRA_TEXTO = 1000
+
+
+# ========================================
+# ESTIMATIVA DE TAMANHO
+# ========================================
+
+def _bytes_coluna(serie):
+    """Bytes de uma coluna; textos em object são estimados por amostra (sem percorrer a coluna toda)"""
+    if serie.dtype != object or len(serie) <= AMOSTRA_TEXTO:
+        return int(serie.memory_usage(deep=True, index=False))
+    posicoes = np.linspace(0, len(serie) - 1, AMOSTRA_TEXTO).astype('int64')
+    amostra = serie.iloc[posicoes].memory_usage(deep=True, index=False)
+    return int(amostra / AMOSTRA_TEXTO * len(serie))
+
+
+def estimar_bytes(valor):
+    """Tamanho aproximado de um valor memorizado (tabelas, séries, arrays e coleções deles)"""
+    if isinstance(valor, pd.DataFrame):
+        return sum(_bytes_coluna(valor[coluna]) for coluna in valor.columns)
+    if isinstance(valor, pd.Series):
+        return _bytes_coluna(valor)
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_bytes(item) for item in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(estimar_bytes(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+# ========================================
+# REGISTRO DO PROCESSO
+# ========================================
+
+class RegistroMemos:
+    """Tamanho das entradas de todas as sessões, com descarte das menos recentes acima do limite"""
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self.total_bytes = 0
+        # (id do memo, chave) -> (referência fraca ao memo, bytes), da menos para a mais recente
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        self._ids = itertools.count()
+
+    def novo_id(self):
+        """Identificador de um memo de sessão (ids de objetos podem ser reaproveitados)"""
+        return next(self._ids)
+
+    def registrar(self, memo, chave, tamanho):
+        """Contabiliza uma entrada nova e libera espaço se o limite for ultrapassado"""
+        with self._trava:
+            anterior = self._entradas.pop((memo.id, chave), None)
+            if anterior is not None:
+                self.total_bytes -= anterior[1]
+            self._entradas[(memo.id, chave)] = (weakref.ref(memo), tamanho)
+            self.total_bytes += tamanho
+            self._liberar()
+
+    def usar(self, memo, chave):
+        """Marca a entrada como a mais recente"""
+        with self._trava:
+            if (memo.id, chave) in self._entradas:
+                self._entradas.move_to_end((memo.id, chave))
+
+    def remover(self, memo, chave):
+        """Tira uma entrada da contagem (descartada pela própria sessão)"""
+        with self._trava:
+            anterior = self._entradas.pop((memo.id, chave), None)
+            if anterior is not None:
+                self.total_bytes -= anterior[1]
+
+    def _liberar(self):
+        """Remove entradas de sessões encerradas e, se preciso, as menos recentes (exceto a última)"""
+        for item, (referencia, tamanho) in list(self._entradas.items()):
+            if referencia() is None:
+                del self._entradas[item]
+                self.total_bytes -= tamanho
+
+        while self.total_bytes > self.limite_bytes and len(self._entradas) > 1:
+            (_, chave), (referencia, tamanho) = self._entradas.popitem(last=False)
+            self.total_bytes -= tamanho
+            memo = referencia()
+            if memo is None:
+                continue
+            # Fatias de uma tabela descartada manteriam a tabela viva: saem junto
+            for removida in memo._remover(chave):
+                dependente = self._entradas.pop((memo.id, removida), None)
+                if dependente is not None:
+                    self.total_bytes -= dependente[1]
+
+    def resumo(self):
+        """Sessões com entradas, quantidade de entradas e bytes em uso"""
+        with self._trava:
+            vivas = [(item, dados) for item, dados in self._entradas.items() if dados[0]() is not None]
+            return {
+                'sessoes': len({id_memo for (id_memo, _), _ in vivas}),
+                'entradas': len(vivas),
+                'bytes': sum(tamanho for _, (_, tamanho) in vivas),
+                'limite_bytes': self.limite_bytes,
+            }
+
+
+# ========================================
+# MEMO DE UMA SESSÃO
+# ========================================
+
+class MemoSessao:
+    """Visões e insumos de página de uma sessão, por (versão, curso, item)"""
+
+    def __init__(self, registro):
+        self.id = registro.novo_id()
+        self._registro = registro
+        self._entradas = {}
+        # chave -> chaves de entradas que são fatias dela
+        self._dependentes = {}
+        # chave -> marca com que o valor foi calculado (ver `obter`)
+        self._marcas = {}
+
+    def obter(self, chave, calcular, depende_de=None, marca=None):
+        """
+        Valor memorizado da chave ou o resultado de `calcular()`, guardado.
+
+        Com `depende_de`, o valor é tratado como fatia (sem cópia) de outra
+        entrada, ou das tabelas compartilhadas do processo identificadas pela
+        chave: não conta no tamanho e é descartado junto com ela. Com `marca`
+        (ex.: a data de referência), o valor só é reaproveitado se foi calculado
+        com a mesma marca; senão, é substituído.
+        """
+        if chave in self._entradas and self._marcas.get(chave) != marca:
+            self.descartar(chave)
+        try:
+            valor = self._entradas[chave]
+        except KeyError:
+            valor = calcular()
+            self._entradas[chave] = valor
+            if marca is not None:
+                self._marcas[chave] = marca
+            if depende_de is not None:
+                self._dependentes.setdefault(depende_de, set()).add(chave)
+            self._registro.registrar(self, chave, 0 if depende_de is not None else estimar_bytes(valor))
+            return valor
+        self._registro.usar(self, chave)
+        return valor
+
+    def _remover(self, chave):
+        """Remove a entrada e suas fatias do memo; retorna as chaves removidas além dela"""
+        self._entradas.pop(chave, None)
+        self._marcas.pop(chave, None)
+        dependentes = self._dependentes.pop(chave, set())
+        for dependente in dependentes:
+            self._entradas.pop(dependente, None)
+            self._marcas.pop(dependente, None)
+        return dependentes
+
+    def descartar(self, chave):
+        """Remove uma entrada e suas fatias (ex.: resultado de uma carga que falhou)"""
+        for removida in [chave, *self._remover(chave)]:
+            self._registro.remover(self, removida)
+
+    def manter_versao(self, versao):
+        """Descarta as entradas de outras versões do snapshot (e as fatias de tabelas delas)"""
+        for chave in [chave for chave in {*self._entradas, *self._dependentes} if chave[0] != versao]:
+            self.descartar(chave)
@@ -0,0 +1,153 @@
+# 💾 ORÇAMENTO DE MEMÓRIA
+
+"""
+Redução do espaço ocupado pelas tabelas carregadas (opção `ECONOMIZAR_MEMORIA`).
+
+- Números: cada coluna de medida vai para o menor tipo que guarda todos os
+  valores sem perda (inteiros de 8/16/32 bits, `float32` quando a conversão
+  é exata). As chaves (`id*`, `codDisciplina`) continuam como estão, porque
+  alimentam índices e contas de posição.
+- Datas: colunas de data que a exportação traz como texto (ex.:
+  `Data Nascimento`) viram `datetime64` (8 bytes por valor em vez de um
+  objeto de texto), desde que todos os valores sejam convertidos.
+- Textos: colunas pouco usadas pelas análises (nome, endereço, contatos,
+  documentos...) passam para strings do pyarrow, guardadas em um único
+  buffer contíguo. Os textos usados em filtros e agrupamentos ficam em
+  `COLUNAS_TEXTO_FREQUENTES` e não mudam.
+
+`reduzir_memoria` devolve a tabela reduzida e o relatório de bytes por coluna
+antes e depois, exibido no dashboard. `reduzir_tabelas` aplica a redução a
+várias tabelas com um orçamento conjunto: se ainda não couberem, os textos
+frequentes também passam para strings do pyarrow, do maior para o menor, até
+caber (comparações e agrupamentos continuam funcionando, só mais lentos).
+"""
+
+import numpy as np
+import pandas as pd
+
+# Textos usados em filtros, agrupamentos e comparações (permanecem como object)
+COLUNAS_TEXTO_FREQUENTES = ('Curso', 'Disciplina', 'Aluno Ativo', 'UF', 'Cidade1', 'Situação', 'Legenda')
+
+# Formatos das datas que a exportação traz como texto
+FORMATOS_DATA_TEXTO = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y')
+
+TIPO_TEXTO_COMPACTO = 'string[pyarrow]'
+
+
+# ========================================
+# CONVERSÕES POR TIPO DE COLUNA
+# ========================================
+
+def _chave(coluna):
+    """Colunas de identificação, mantidas no tipo original"""
+    return str(coluna).startswith('id') or coluna == 'codDisciplina'
+
+
+def _inteiro_compacto(serie):
+    """Menor tipo inteiro com sinal que comporta os valores"""
+    return pd.to_numeric(serie, downcast='integer')
+
+
+def _real_compacto(serie):
+    """Inteiro (sem ausentes e sem casas decimais) ou float32, se a conversão não perder nada"""
+    valores = serie.to_numpy(dtype='float64')
+    ausentes = np.isnan(valores)
+    if not ausentes.any() and np.array_equal(valores, np.round(valores)):
+        return _inteiro_compacto(serie.astype('int64'))
+    reduzidos = valores.astype('float32')
+    if np.array_equal(reduzidos.astype('float64'), valores, equal_nan=True):
+        return serie.astype('float32')
+    return serie
+
+
+def _data_compacta(serie):
+    """Data em texto convertida para datetime64 (None se algum valor não for reconhecido)"""
+    preenchidos = int(serie.notna().sum())
+    for formato in FORMATOS_DATA_TEXTO:
+        datas = pd.to_datetime(serie, format=formato, errors='coerce')
+        if int(datas.notna().sum()) == preenchidos:
+            return datas
+    return None
+
+
+def _texto_compacto(serie):
+    """Texto em string do pyarrow (valores não textuais, como números da planilha, viram texto)"""
+    return serie.astype(object).where(serie.isna(), serie.astype(str)).astype(TIPO_TEXTO_COMPACTO)
+
+
+# ========================================
+# REDUÇÃO E RELATÓRIO
+# ========================================
+
+def _medir(df):
+    """Tipo e bytes (incluindo o conteúdo dos textos) de cada coluna"""
+    return df.dtypes.astype(str).to_numpy(), df.memory_usage(deep=True, index=False).to_numpy(dtype='int64')
+
+
+def _relatorio(tabela, antes, df):
+    """Bytes e tipos por coluna antes e depois da redução"""
+    tipos_depois, bytes_depois = _medir(df)
+    return pd.DataFrame({
+        'Tabela': tabela,
+        'Coluna': df.columns.astype(str),
+        'Tipo Antes': antes[0],
+        'Tipo Depois': tipos_depois,
+        'Bytes Antes': antes[1],
+        'Bytes Depois': bytes_depois,
+    })
+
+
+def reduzir_memoria(df, tabela):
+    """
+    Tabela com os tipos compactos e o relatório por coluna (bytes antes/depois).
+
+    A tabela original não é alterada.
+    """
+    antes = _medir(df)
+    df = df.copy()
+    for coluna in df.columns:
+        serie = df[coluna]
+        if _chave(coluna):
+            continue
+        if serie.dtype.kind in 'iu':
+            df[coluna] = _inteiro_compacto(serie)
+        elif serie.dtype.kind == 'f':
+            df[coluna] = _real_compacto(serie)
+        elif serie.dtype == object and coluna not in COLUNAS_TEXTO_FREQUENTES:
+            datas = _data_compacta(serie) if str(coluna).startswith('Data') else None
+            df[coluna] = datas if datas is not None else _texto_compacto(serie)
+    return df, _relatorio(tabela, antes, df)
+
+
+def reduzir_tabelas(tabelas, orcamento_bytes=None):
+    """
+    Tabelas (nome -> DataFrame) reduzidas e o relatório conjunto por coluna.
+
+    Acima de `orcamento_bytes`, compacta também os textos frequentes até caber
+    (ou até não restar nenhum).
+    """
+    reduzidas, relatorios = {}, []
+    for nome, df in tabelas.items():
+        reduzidas[nome], relatorio = reduzir_memoria(df, nome)
+        relatorios.append(relatorio)
+    relatorio = pd.concat(relatorios, ignore_index=True)
+    if orcamento_bytes is None:
+        return reduzidas, relatorio
+
+    excesso = int(relatorio['Bytes Depois'].sum()) - orcamento_bytes
+    frequentes = relatorio[relatorio['Coluna'].isin(COLUNAS_TEXTO_FREQUENTES) & (relatorio['Tipo Depois'] == 'object')]
+    for indice in frequentes.sort_values('Bytes Depois', ascending=False, kind='stable').index:
+        if excesso <= 0:
+            break
+        df = reduzidas[relatorio.at[indice, 'Tabela']]
+        coluna = relatorio.at[indice, 'Coluna']
+        df[coluna] = _texto_compacto(df[coluna])
+        bytes_depois = int(df[coluna].memory_usage(deep=True, index=False))
+        excesso -= relatorio.at[indice, 'Bytes Depois'] - bytes_depois
+        relatorio.loc[indice, ['Tipo Depois', 'Bytes Depois']] = [str(df[coluna].dtype), bytes_depois]
+    return reduzidas, relatorio
+
+
+def relatorio_sem_reducao(df, tabela):
+    """Relatório de bytes por coluna com a redução desligada (antes = depois)"""
+    return _relatorio(tabela, _medir(df), df)
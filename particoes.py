@@ -0,0 +1,279 @@
+# 🗂️ ARMAZENAMENTO PARTICIONADO POR CURSO
+
+"""
+Grava o snapshot já limpo e vinculado em partições por curso (estilo Hive) e
+lê apenas o que a tela precisa.
+
+Estrutura gerada:
+
+    dados_particionados/
+        manifesto.json
+        snapshot-<carimbo>/
+            cursos/idCurso=<id>/parte-0.parquet
+            disciplinas/idCurso=<id>/parte-0.parquet   (idCurso=-1: linhas sem vínculo)
+            esbocos/<metrica>.parquet                  (esboços de quantis por curso e disciplina)
+
+Cada gravação cria uma nova pasta `snapshot-<carimbo>` e só então troca o
+manifesto (que aponta para ela) com um `os.replace` atômico: quem lê sempre
+encontra um manifesto completo e a pasta que ele indica. A pasta do snapshot
+anterior é mantida até a gravação seguinte, para as leituras em andamento.
+
+O manifesto traz os nomes dos cursos, a quantidade de linhas de cada partição,
+o catálogo de disciplinas (nome por `codDisciplina`) com as disciplinas
+compartilhadas entre cursos (usadas na mescla dos placares), os avisos da
+ingestão (ex.: IDs inválidos), o mês do snapshot
+(usado pelas coortes de um curso isolado) e os agregados da Visão Geral por
+curso e para "Todos". Assim a Visão Geral não lê nenhuma partição e
+selecionar um curso lê só os arquivos dele. Os esboços de quantis
+(`esbocos.py`) são calculados aqui, na gravação, e lidos inteiros (são pequenos).
+
+Para gerar (na pasta dos arquivos de origem):
+
+    python particoes.py [--pasta dados_particionados]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from coortes import extrair_atividade
+from esbocos import METRICAS, construir_esbocos
+from ingestao import carregar_dados, fatiar_curso, versao_snapshot
+from placares import disciplinas_compartilhadas
+
+PASTA_PARTICOES = 'dados_particionados'
+ARQUIVO_MANIFESTO = 'manifesto.json'
+PREFIXO_SNAPSHOT = 'snapshot-'
+TABELAS = ('cursos', 'disciplinas')
+
+# idCurso das linhas de disciplinas sem matrícula vinculada
+SEM_CURSO = -1
+
+
+# ========================================
+# FUNÇÕES AUXILIARES
+# ========================================
+
+def caminho_manifesto(pasta=PASTA_PARTICOES):
+    """Caminho do manifesto de uma pasta de partições"""
+    return os.path.join(pasta, ARQUIVO_MANIFESTO)
+
+
+def pasta_snapshot(manifesto, pasta=PASTA_PARTICOES):
+    """Pasta com os arquivos do snapshot descrito pelo manifesto (a própria pasta em manifestos antigos)"""
+    return os.path.join(pasta, manifesto.get('snapshot', ''))
+
+
+def _remover_snapshots(pasta, manter):
+    """Remove as pastas de snapshot (e os arquivos do formato antigo, sem subpasta) fora de `manter`"""
+    for nome in os.listdir(pasta):
+        antiga = nome.startswith(PREFIXO_SNAPSHOT) or (nome in TABELAS + ('esbocos',) and '' not in manter)
+        if antiga and nome not in manter:
+            shutil.rmtree(os.path.join(pasta, nome), ignore_errors=True)
+
+
+def _arquivo_particao(pasta, tabela, id_curso):
+    """Caminho do arquivo de uma partição (tabela, idCurso)"""
+    return os.path.join(pasta, tabela, f"idCurso={id_curso}", 'parte-0.parquet')
+
+
+def _arquivo_esboco(pasta, metrica):
+    """Caminho do arquivo de esboços de uma métrica"""
+    return os.path.join(pasta, 'esbocos', f"{metrica}.parquet")
+
+
+def _tipos_parquet(df):
+    """Converte colunas de texto com tipos misturados (ex.: números e textos da planilha) para texto"""
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].astype(str).mask(df[col].isna())
+    return df
+
+
+def _contagens(serie):
+    """Contagens de uma série como dicionário JSON (mantendo a ordem)"""
+    return {str(chave): int(valor) for chave, valor in serie.items()}
+
+
+# ========================================
+# AGREGADOS DA VISÃO GERAL
+# ========================================
+
+def resumir_visao_geral(df_cursos):
+    """Métricas e séries da página Visão Geral para um conjunto de matrículas"""
+    ativos = df_cursos['Aluno Ativo'] == 'Sim'
+    inativos = df_cursos['Aluno Ativo'] == 'Não'
+    com_data = df_cursos['Data Matrícula'].notna()
+
+    meses = df_cursos.loc[com_data, 'Data Matrícula'].dt.to_period('M').astype(str)
+    meses_cancelados = df_cursos.loc[com_data & inativos, 'Data Matrícula'].dt.to_period('M').astype(str)
+
+    return {
+        'alunos_ativos': int(df_cursos.loc[ativos, 'idAluno'].nunique()),
+        'alunos_inativos': int(df_cursos.loc[inativos, 'idAluno'].nunique()),
+        'matriculas': int(len(df_cursos)),
+        'cursos': int(df_cursos['Curso'].nunique()),
+        'status': _contagens(df_cursos['Aluno Ativo'].value_counts()),
+        'matriculas_curso': _contagens(df_cursos['Curso'].value_counts()),
+        'matriculas_mes': _contagens(meses.groupby(meses).size()),
+        'cancelamentos_mes': _contagens(meses_cancelados.groupby(meses_cancelados).size()),
+    }
+
+
+# ========================================
+# GRAVAÇÃO
+# ========================================
+
+def gravar_particoes(df_cursos, df_disciplinas, pasta=PASTA_PARTICOES, versao=None, avisos=None):
+    """
+    Grava as tabelas (ordenadas por `idCurso`, como saem da ingestão) em uma
+    partição por curso e escreve o manifesto (com os `avisos` da ingestão).
+
+    As partições vão para uma nova pasta de snapshot e o manifesto que aponta
+    para ela é escrito por último, com troca atômica, para que o dashboard
+    nunca leia um snapshot pela metade.
+    """
+    try:
+        anterior = ler_manifesto(pasta).get('snapshot', '')
+    except (OSError, ValueError):
+        anterior = None
+    snapshot = f"{PREFIXO_SNAPSHOT}{time.time_ns()}-{os.getpid()}"
+    temporaria = os.path.join(pasta, snapshot)
+    os.makedirs(temporaria)
+
+    df_cursos = _tipos_parquet(df_cursos.copy())
+    df_disciplinas = _tipos_parquet(df_disciplinas.copy())
+
+    cursos = []
+    for id_curso in df_cursos['idCurso'].unique():
+        id_curso = int(id_curso)
+        matriculas = fatiar_curso(df_cursos, id_curso)
+        disciplinas = fatiar_curso(df_disciplinas, id_curso)
+        for tabela, dados in zip(TABELAS, (matriculas, disciplinas)):
+            arquivo = _arquivo_particao(temporaria, tabela, id_curso)
+            os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+            dados.to_parquet(arquivo, index=False)
+
+        nome = matriculas['Curso'].dropna()
+        cursos.append({
+            'idCurso': id_curso,
+            'Curso': str(nome.iloc[0]) if len(nome) else None,
+            'matriculas': int(len(matriculas)),
+            'linhas_disciplinas': int(len(disciplinas)),
+            'visao_geral': resumir_visao_geral(matriculas),
+        })
+
+    sem_curso = fatiar_curso(df_disciplinas, SEM_CURSO)
+    arquivo = _arquivo_particao(temporaria, 'disciplinas', SEM_CURSO)
+    os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    sem_curso.to_parquet(arquivo, index=False)
+
+    for metrica, esboco in construir_esbocos(df_disciplinas).items():
+        arquivo = _arquivo_esboco(temporaria, metrica)
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        esboco.to_parquet(arquivo, index=False)
+
+    nomes = df_disciplinas[['codDisciplina', 'Disciplina']].drop_duplicates('codDisciplina')
+    nomes = nomes[nomes['codDisciplina'] >= 0].sort_values('codDisciplina')
+
+    manifesto = {
+        'versao': versao or versao_snapshot(),
+        'snapshot': snapshot,
+        'gerado_em': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'cursos': cursos,
+        'linhas_sem_curso': int(len(sem_curso)),
+        'disciplinas': nomes['Disciplina'].astype(str).tolist(),
+        'compartilhadas': np.flatnonzero(disciplinas_compartilhadas(df_disciplinas, len(nomes))).tolist(),
+        'mes_snapshot': int(extrair_atividade(df_cursos, df_disciplinas)['mes_snapshot']),
+        'todos': resumir_visao_geral(df_cursos),
+        'avisos': list(avisos or []),
+    }
+    manifesto_temporario = f"{caminho_manifesto(pasta)}.tmp-{os.getpid()}"
+    with open(manifesto_temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False)
+    os.replace(manifesto_temporario, caminho_manifesto(pasta))
+
+    _remover_snapshots(pasta, {snapshot, anterior})
+    return manifesto
+
+
+# ========================================
+# LEITURA
+# ========================================
+
+def ler_manifesto(pasta=PASTA_PARTICOES):
+    """Lê o manifesto das partições"""
+    with open(caminho_manifesto(pasta), encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def ler_particao(id_curso, pasta=PASTA_PARTICOES):
+    """
+    Lê somente as matrículas e disciplinas de um curso (`pasta` é a pasta do
+    snapshot, ver `pasta_snapshot`).
+
+    O `idMatricula` passa a ser relativo à partição (0..n-1), de modo que as
+    duas tabelas funcionam sozinhas como um snapshot de um curso só.
+    """
+    df_cursos = pd.read_parquet(_arquivo_particao(pasta, 'cursos', id_curso))
+    df_disciplinas = pd.read_parquet(_arquivo_particao(pasta, 'disciplinas', id_curso))
+
+    inicio = int(df_cursos['idMatricula'].iloc[0]) if len(df_cursos) else 0
+    df_cursos['idMatricula'] -= inicio
+    df_disciplinas['idMatricula'] -= inicio
+    return df_cursos, df_disciplinas
+
+
+def ler_todas_particoes(pasta=PASTA_PARTICOES, manifesto=None):
+    """Reconstrói as tabelas completas (mesma ordem e `idMatricula` da ingestão)"""
+    manifesto = manifesto or ler_manifesto(pasta)
+    pasta = pasta_snapshot(manifesto, pasta)
+    ids = [curso['idCurso'] for curso in manifesto['cursos']]
+
+    df_cursos = pd.concat([pd.read_parquet(_arquivo_particao(pasta, 'cursos', i)) for i in ids],
+                          ignore_index=True)
+    df_disciplinas = pd.concat([pd.read_parquet(_arquivo_particao(pasta, 'disciplinas', i))
+                                for i in [SEM_CURSO] + ids],
+                               ignore_index=True)
+    return df_cursos, df_disciplinas
+
+
+def ler_esbocos(pasta=PASTA_PARTICOES):
+    """Esboços de quantis gravados junto com as partições, por métrica (`pasta` do snapshot)"""
+    return {metrica: pd.read_parquet(_arquivo_esboco(pasta, metrica)) for metrica in METRICAS}
+
+
+def nomes_do_manifesto(manifesto):
+    """Catálogo de disciplinas do manifesto, indexado pelo `codDisciplina`"""
+    return np.array(manifesto['disciplinas'], dtype=object)
+
+
+def compartilhadas_do_manifesto(manifesto):
+    """Máscara das disciplinas compartilhadas entre cursos (None em manifestos sem a lista)"""
+    if 'compartilhadas' not in manifesto:
+        return None
+    mascara = np.zeros(len(manifesto['disciplinas']), dtype=bool)
+    mascara[manifesto['compartilhadas']] = True
+    return mascara
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grava o snapshot particionado por curso")
+    parser.add_argument('--pasta', default=PASTA_PARTICOES, help="Pasta de destino das partições")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    versao = versao_snapshot()
+    avisos = []
+    df_cursos, df_disciplinas = carregar_dados(avisos=avisos)
+    for aviso in avisos:
+        print(f"⚠️ {aviso}")
+    manifesto = gravar_particoes(df_cursos, df_disciplinas, args.pasta, versao, avisos)
+    print(f"✅ {len(manifesto['cursos'])} cursos gravados em '{args.pasta}' "
+          f"({len(df_cursos):,} matrículas, {len(df_disciplinas):,} linhas de disciplinas) "
+          f"em {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,83 @@
+# ⏱️ PERFIL DE INICIALIZAÇÃO
+
+"""
+Mede o custo de partida a frio de um worker do dashboard.
+
+Mostra o tempo de importação (via `python -X importtime`) de cada pacote usado
+pelo dashboard, separando o que é carregado na subida do que é adiado até o
+primeiro uso, e o tempo de `carregar_dados()`.
+
+Uso:
+    python perfil_inicializacao.py [--top 15]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+# Módulos importados na subida do script (antes do login)
+MODULOS_SUBIDA = ['streamlit', 'pandas', 'numpy', 'ingestao', 'aquecimento']
+
+# Módulos adiados até o primeiro uso (páginas com gráficos / tabelas estilizadas)
+MODULOS_ADIADOS = ['plotly.express', 'plotly.graph_objects', 'pandas.io.formats.style', 'matplotlib']
+
+
+def perfil_importacao(modulos, ja_importados=()):
+    """
+    Retorna [(modulo, tempo_acumulado_s)] dos módulos de topo importados.
+
+    `ja_importados` são carregados antes da medição, para isolar o custo
+    incremental (ex.: plotly depois que o streamlit já está em memória).
+    """
+    preambulo = ''.join(f'import {m}; ' for m in ja_importados)
+    codigo = preambulo + 'import sys; sys.stderr.write("--inicio--\\n"); ' + '; '.join(f'import {m}' for m in modulos)
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                               capture_output=True, text=True)
+
+    linhas = resultado.stderr.split('--inicio--\n', 1)[-1].splitlines()
+    tempos = []
+    for linha in linhas:
+        if not linha.startswith('import time:') or '|' not in linha:
+            continue
+        _, acumulado, nome = linha[len('import time:'):].split('|')
+        acumulado = acumulado.strip()
+        if not acumulado.isdigit():
+            continue
+        # Apenas módulos de topo na árvore (o -X importtime indenta os submódulos)
+        if not nome.startswith('  '):
+            tempos.append((nome.strip(), int(acumulado) / 1e6))
+    return tempos
+
+
+def imprimir_perfil(titulo, tempos, top):
+    """Imprime os módulos mais caros de um perfil"""
+    total = sum(t for _, t in tempos)
+    print(f"\n{titulo}: {total:.3f}s")
+    for nome, tempo in sorted(tempos, key=lambda x: x[1], reverse=True)[:top]:
+        print(f"  {tempo:8.3f}s  {nome}")
+
+
+def perfil_carga():
+    """Mede o tempo de carga e limpeza dos arquivos de origem"""
+    from ingestao import carregar_dados
+
+    inicio = time.perf_counter()
+    df_cursos, df_disciplinas = carregar_dados()
+    duracao = time.perf_counter() - inicio
+    print(f"\ncarregar_dados(): {duracao:.3f}s "
+          f"({len(df_cursos):,} matrículas, {len(df_disciplinas):,} linhas de disciplinas)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfil de partida a frio do dashboard")
+    parser.add_argument('--top', type=int, default=15, help="Quantidade de módulos a exibir")
+    parser.add_argument('--sem-dados', action='store_true', help="Não medir carregar_dados()")
+    args = parser.parse_args()
+
+    imprimir_perfil("Importações na subida", perfil_importacao(MODULOS_SUBIDA), args.top)
+    for modulo in MODULOS_ADIADOS:
+        imprimir_perfil(f"Adiado: {modulo}", perfil_importacao([modulo], MODULOS_SUBIDA), args.top)
+
+    if not args.sem_dados:
+        perfil_carga()
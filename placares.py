@@ -0,0 +1,135 @@
+# 🏆 PLACARES DAS DISCIPLINAS
+
+"""
+Rankings (Top N) das disciplinas por seleção parcial, sem ordenar a tabela toda.
+
+`top_k` separa os k primeiros com `np.partition` (O(n)) e ordena só eles,
+com o mesmo desempate de um `sort_values(kind='stable')` (menor código
+primeiro), então os rankings saem idênticos aos da ordenação completa.
+
+`montar_placar` guarda, para um curso e os mínimos atuais (avaliações e
+matrículas), até `CAPACIDADE_PLACAR` disciplinas em ordem para cada ranking
+(notas, conclusões, acessos, taxa e tempo de conclusão), junto com as somas e
+contagens das disciplinas candidatas. Os gráficos apenas leem esses arrays.
+
+"Todos" mescla os placares dos cursos somando as contagens das candidatas, sem
+voltar às linhas. A mescla é exata: uma disciplina exclusiva de um curso tem os
+mesmos valores no curso e em "Todos", então se ela não está entre as primeiras
+do curso, também não estará em "Todos". As disciplinas com linhas em mais de
+um curso (compartilhadas) são sempre levadas como candidatas.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Maior Top N da barra lateral (profundidade guardada de cada ranking)
+CAPACIDADE_PLACAR = 100
+
+# Rankings por média: (soma, contagem da média, coluna do mínimo, mínimo usado)
+MEDIAS = {
+    'notas': ('soma_nota', 'avaliacoes', 'avaliacoes', 'min_avaliacoes'),
+    'taxa': ('soma_percentual', 'com_percentual', 'matriculas', 'min_matriculas'),
+    'tempo': ('soma_dias', 'com_dias', 'com_dias', 'min_avaliacoes'),
+}
+
+# Rankings por contagem (sem mínimo)
+CONTAGENS = ('conclusoes', 'acessos')
+
+# Rankings do menor para o maior valor
+CRESCENTES = ('tempo',)
+
+RANKINGS = tuple(MEDIAS) + CONTAGENS
+
+
+# ========================================
+# SELEÇÃO PARCIAL
+# ========================================
+
+def top_k(valores, k, elegiveis=None, crescente=False):
+    """
+    Posições dos k maiores (ou menores) valores entre os elegíveis, em ordem.
+
+    Empates ficam na ordem das posições, como em uma ordenação estável.
+    """
+    posicoes = np.arange(len(valores)) if elegiveis is None else np.flatnonzero(elegiveis)
+    if k <= 0 or len(posicoes) == 0:
+        return posicoes[:0]
+    chave = np.asarray(valores, dtype='float64')[posicoes]
+    if not crescente:
+        chave = -chave
+
+    if k < len(posicoes):
+        # Valor do k-ésimo colocado: todos os melhores entram e os empatados
+        # com ele entram pela posição até completar k
+        corte = np.partition(chave, k - 1)[k - 1]
+        melhores = np.flatnonzero(chave < corte)
+        empatados = np.flatnonzero(chave == corte)[:k - len(melhores)]
+        selecionados = np.concatenate([melhores, empatados])
+        posicoes, chave = posicoes[selecionados], chave[selecionados]
+
+    return posicoes[np.lexsort((posicoes, chave))]
+
+
+# ========================================
+# PLACARES
+# ========================================
+
+def _metrica(resumo, ranking, minimos):
+    """Valor e elegibilidade de cada linha do resumo em um ranking"""
+    if ranking in CONTAGENS:
+        valor = resumo[ranking].to_numpy()
+        return valor, valor > 0
+
+    soma, contagem, coluna_minimo, minimo = MEDIAS[ranking]
+    contagem = resumo[contagem].to_numpy()
+    valor = np.divide(resumo[soma].to_numpy(dtype='float64'), contagem,
+                      out=np.zeros(len(resumo)), where=contagem > 0)
+    return valor, (resumo[coluna_minimo].to_numpy() >= minimos[minimo]) & (contagem > 0)
+
+
+def _ordenar(candidatas, minimos, capacidade):
+    """Placar a partir das somas e contagens das candidatas (indexadas pelo código, em ordem)"""
+    codigos = candidatas.index.to_numpy()
+    ordens = {}
+    for ranking in RANKINGS:
+        valor, elegiveis = _metrica(candidatas, ranking, minimos)
+        ordens[ranking] = codigos[top_k(valor, capacidade, elegiveis, ranking in CRESCENTES)]
+    return {'resumo': candidatas, 'ordens': ordens}
+
+
+def montar_placar(resumo, min_avaliacoes, min_matriculas, compartilhadas=None, capacidade=CAPACIDADE_PLACAR):
+    """
+    Placar de um curso a partir do resumo por disciplina (`resumir_disciplinas`).
+
+    O resumo é indexado pelo código e pode trazer só parte das disciplinas (ex.:
+    as presentes no curso). `compartilhadas` é a máscara (por código) das
+    disciplinas presentes em mais de um curso; com None, todas as disciplinas
+    do curso são levadas como candidatas.
+    """
+    minimos = {'min_avaliacoes': min_avaliacoes, 'min_matriculas': min_matriculas}
+    presentes = resumo.to_numpy().any(axis=1)
+    levadas = presentes if compartilhadas is None else presentes & compartilhadas[resumo.index.to_numpy()]
+
+    candidatas = [np.flatnonzero(levadas)]
+    for ranking in RANKINGS:
+        valor, elegiveis = _metrica(resumo, ranking, minimos)
+        candidatas.append(top_k(valor, capacidade, elegiveis & ~levadas, ranking in CRESCENTES))
+
+    posicoes = np.unique(np.concatenate(candidatas))
+    # O resumo é indexado pelo código: as candidatas mantêm o código como índice
+    return _ordenar(resumo.iloc[posicoes], minimos, capacidade)
+
+
+def mesclar_placares(placares, min_avaliacoes, min_matriculas, capacidade=CAPACIDADE_PLACAR):
+    """
+    Placar de vários cursos, somando as contagens das candidatas de cada um
+    (placares montados com os mesmos mínimos e capacidade).
+    """
+    candidatas = pd.concat([placar['resumo'] for placar in placares]).groupby(level=0).sum()
+    return _ordenar(candidatas, {'min_avaliacoes': min_avaliacoes, 'min_matriculas': min_matriculas}, capacidade)
+
+
+def disciplinas_compartilhadas(df_disciplinas, n_disciplinas):
+    """Máscara (por `codDisciplina`) das disciplinas com linhas em mais de um curso (sem curso conta como um)"""
+    pares = df_disciplinas.loc[df_disciplinas['codDisciplina'] >= 0, ['codDisciplina', 'idCurso']].drop_duplicates()
+    return np.bincount(pares['codDisciplina'].to_numpy(dtype='int64'), minlength=n_disciplinas) > 1
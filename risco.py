@@ -0,0 +1,155 @@
+# 🚨 RISCO DE EVASÃO
+
+"""
+Pontuação de risco de evasão por aluno a partir do progresso nas disciplinas.
+
+As características de cada aluno usam as mesmas categorias de engajamento da
+página de disciplinas (não iniciadas, apenas visualizadas, abandonadas),
+além de conclusões, percentual médio e dias desde o último acesso. São
+acumuladas por lotes de linhas com `np.bincount`, então a memória fica
+limitada ao tamanho do lote mais um array por característica.
+
+A pontuação é uma combinação logística com pesos fixos (`PESOS_RISCO`), sem
+modelo treinado: serve para ordenar os alunos que merecem contato primeiro.
+"""
+
+import numpy as np
+import pandas as pd
+
+NS_POR_DIA = 86_400 * 10**9
+
+# Linhas de disciplinas processadas por lote
+TAMANHO_LOTE = 250_000
+
+# Dias sem acesso a partir dos quais o peso de inatividade é máximo
+DIAS_SEM_ACESSO_MAXIMO = 180
+
+# Pesos da combinação logística (frações sobre as disciplinas liberadas)
+PESOS_RISCO = {
+    'intercepto': -1.5,
+    'nao_iniciadas': 2.5,
+    'visualizadas': 2.0,
+    'abandonadas': 1.5,
+    'concluidas': -2.0,
+    'percentual_medio': -1.0,
+    'inatividade': 2.5,
+}
+
+CARACTERISTICAS = ['liberadas', 'nao_iniciadas', 'visualizadas', 'abandonadas', 'concluidas',
+                   'soma_percentual', 'com_percentual']
+
+
+def _acumular_lote(lote, aluno, n_alunos, limite_ns, percentual_maximo, acumulado, ultimo_acesso):
+    """Soma as características de um lote de linhas nos acumuladores por aluno"""
+    # Código -1: linha sem aluno
+    com_aluno = aluno >= 0
+    liberado = lote['Liberado a Partir De'].to_numpy(dtype='datetime64[ns]')
+    liberada = com_aluno & ~np.isnat(liberado) & (liberado.view('int64') < limite_ns)
+
+    # Percentual ausente não entra em nenhuma categoria nem na média, e concluída é
+    # exatamente 100% (mesmas regras de `agregados`)
+    percentual = lote['Percentual Concluído'].to_numpy(dtype='float64')
+    tem_percentual = liberada & ~np.isnan(percentual)
+    acesso = lote['Último Acesso'].to_numpy(dtype='datetime64[ns]')
+    acessou = com_aluno & ~np.isnat(acesso)
+    sem_termino = lote['Data Término'].isna().to_numpy()
+
+    pendente = tem_percentual & sem_termino & (percentual < percentual_maximo)
+    mascaras = {
+        'liberadas': liberada,
+        'nao_iniciadas': pendente & (percentual == 0) & ~acessou,
+        'visualizadas': pendente & (percentual == 0) & acessou,
+        'abandonadas': pendente & (percentual > 0),
+        'concluidas': tem_percentual & (percentual == 100),
+        'com_percentual': tem_percentual,
+    }
+    for nome, mascara in mascaras.items():
+        acumulado[nome] += np.bincount(aluno[mascara], minlength=n_alunos)
+    acumulado['soma_percentual'] += np.bincount(aluno[tem_percentual], weights=percentual[tem_percentual],
+                                                minlength=n_alunos)
+
+    np.maximum.at(ultimo_acesso, aluno[acessou], acesso[acessou].view('int64'))
+
+
+def caracteristicas_alunos(df_disciplinas, data_referencia, dias_minimos, percentual_maximo,
+                           tamanho_lote=TAMANHO_LOTE):
+    """
+    Características de engajamento por aluno (uma linha por `idAluno`).
+
+    Considera apenas disciplinas liberadas há mais de `dias_minimos` dias
+    em relação a `data_referencia`, como a análise de engajamento. Linhas sem
+    aluno (`idAluno = -1`) ficam de fora.
+    """
+    alunos, ids = pd.factorize(df_disciplinas['idAluno'], sort=True)
+    if len(ids) and ids[0] < 0:
+        # Ordenados: o -1 é o primeiro grupo e passa a ter código -1
+        alunos, ids = alunos - 1, ids[1:]
+    n_alunos = len(ids)
+    referencia_ns = pd.Timestamp(data_referencia).value
+    limite_ns = referencia_ns - dias_minimos * NS_POR_DIA
+
+    acumulado = {nome: np.zeros(n_alunos, dtype='float64') for nome in CARACTERISTICAS}
+    ultimo_acesso = np.full(n_alunos, np.iinfo('int64').min, dtype='int64')
+
+    for inicio in range(0, len(df_disciplinas), tamanho_lote):
+        fim = inicio + tamanho_lote
+        _acumular_lote(df_disciplinas.iloc[inicio:fim], alunos[inicio:fim], n_alunos,
+                       limite_ns, percentual_maximo, acumulado, ultimo_acesso)
+
+    nunca_acessou = ultimo_acesso == np.iinfo('int64').min
+    dias_sem_acesso = np.where(nunca_acessou, np.nan,
+                               (referencia_ns - ultimo_acesso) / NS_POR_DIA)
+
+    caracteristicas = pd.DataFrame({nome: acumulado[nome] for nome in CARACTERISTICAS})
+    caracteristicas.insert(0, 'idAluno', np.asarray(ids))
+    caracteristicas['dias_sem_acesso'] = dias_sem_acesso
+    return caracteristicas
+
+
+def pontuar_risco(caracteristicas, pesos=PESOS_RISCO, tamanho_lote=TAMANHO_LOTE):
+    """Risco de evasão (0-100) para cada aluno, calculado em lotes"""
+    n = len(caracteristicas)
+    risco = np.empty(n, dtype='float64')
+    colunas = {nome: caracteristicas[nome].to_numpy() for nome in CARACTERISTICAS + ['dias_sem_acesso']}
+
+    for inicio in range(0, n, tamanho_lote):
+        fatia = slice(inicio, inicio + tamanho_lote)
+        liberadas = np.maximum(colunas['liberadas'][fatia], 1)
+        com_percentual = np.maximum(colunas['com_percentual'][fatia], 1)
+        # Quem nunca acessou nada conta como inatividade máxima
+        inatividade = np.clip(np.nan_to_num(colunas['dias_sem_acesso'][fatia], nan=DIAS_SEM_ACESSO_MAXIMO)
+                              / DIAS_SEM_ACESSO_MAXIMO, 0, 1)
+
+        z = (pesos['intercepto']
+             + pesos['nao_iniciadas'] * colunas['nao_iniciadas'][fatia] / liberadas
+             + pesos['visualizadas'] * colunas['visualizadas'][fatia] / liberadas
+             + pesos['abandonadas'] * colunas['abandonadas'][fatia] / liberadas
+             + pesos['concluidas'] * colunas['concluidas'][fatia] / liberadas
+             + pesos['percentual_medio'] * colunas['soma_percentual'][fatia] / com_percentual / 100
+             + pesos['inatividade'] * inatividade)
+        risco[fatia] = 100 / (1 + np.exp(-z))
+
+    return risco
+
+
+def ranking_risco(df_disciplinas, df_cursos, data_referencia, dias_minimos, percentual_maximo):
+    """Alunos com disciplinas liberadas, do maior para o menor risco de evasão"""
+    caracteristicas = caracteristicas_alunos(df_disciplinas, data_referencia, dias_minimos, percentual_maximo)
+    caracteristicas = caracteristicas[caracteristicas['liberadas'] > 0].reset_index(drop=True)
+    caracteristicas['risco'] = pontuar_risco(caracteristicas)
+
+    nomes = df_cursos.drop_duplicates('idAluno').set_index('idAluno')['Nome']
+    liberadas = caracteristicas['liberadas']
+    ranking = pd.DataFrame({
+        'idAluno': caracteristicas['idAluno'],
+        'Nome': caracteristicas['idAluno'].map(nomes),
+        'Risco': caracteristicas['risco'],
+        'Disciplinas Liberadas': liberadas.astype('int64'),
+        'Não Iniciadas': caracteristicas['nao_iniciadas'].astype('int64'),
+        'Apenas Visualizadas': caracteristicas['visualizadas'].astype('int64'),
+        'Abandonadas': caracteristicas['abandonadas'].astype('int64'),
+        'Concluídas': caracteristicas['concluidas'].astype('int64'),
+        'Percentual Médio': caracteristicas['soma_percentual'] / caracteristicas['com_percentual'],
+        'Dias sem Acesso': caracteristicas['dias_sem_acesso'].round(),
+    })
+    return ranking.sort_values('Risco', ascending=False, kind='stable').reset_index(drop=True)